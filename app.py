@@ -1,10 +1,25 @@
 import os
+import sys
+import time
+import hashlib
+import atexit
+import tempfile
+import threading
+from contextlib import contextmanager
+import orjson
 import requests
 import psycopg2
-from flask import Flask, render_template, request, redirect, url_for, jsonify
+from psycopg2 import pool
+from psycopg2.extensions import DECIMAL, new_type, register_type
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import Flask, render_template, request, redirect, url_for, jsonify, make_response
+from flask.json.provider import DefaultJSONProvider
+from jinja2 import FileSystemBytecodeCache
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
-from Adafruit_IO import Client, Feed, Data
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 # ----------------------------------------------------------------------
 # 1. CONFIGURATION AND ENVIRONMENT LOADING
@@ -15,18 +30,32 @@ load_dotenv()
 
 app = Flask(__name__)
 
-# --- Essential Configuration Check: Adafruit IO ---
-# Load credentials and strictly check for existence.
-AIO_USERNAME = os.getenv("ADAFRUIT_IO_USERNAME")
-AIO_KEY = os.getenv("ADAFRUIT_IO_KEY")
 
-if not AIO_USERNAME or not AIO_KEY:
-    raise ValueError("Missing Adafruit IO credentials in env variables.")
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson (C-coded) for jsonify, tojson and request bodies."""
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_SORT_KEYS if self.sort_keys else 0
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+app.json = ORJSONProvider(app)
 
-# Initialize Adafruit IO client
-aio = Client(AIO_USERNAME, AIO_KEY)
+# Keep compiled templates on disk so a fresh worker loads bytecode instead of
+# re-parsing every template. Template auto-reload already follows app.debug,
+# so production never stats the files on render.
+JINJA_CACHE_DIR = os.getenv("JINJA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "homeguard-jinja"))
+os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(JINJA_CACHE_DIR)
 
-# --- Essential Configuration Check: Database ---
+# --- Essential Configuration: Adafruit IO and Database ---
+# Everything is read and validated once here, at import, so no request path
+# ever re-checks credentials or rebuilds URLs.
+AIO_USERNAME = os.getenv("ADAFRUIT_IO_USERNAME")
+AIO_KEY = os.getenv("ADAFRUIT_IO_KEY")
 DATABASE_URL = os.getenv("NEON_DATABASE_URL")
 
 # --- Centralized Configuration Validation ---
@@ -83,42 +112,333 @@ FEEDS = {
     'log_motion_event': 'log-motion-event'
 }
 
+# Adafruit IO group holding the live dashboard feeds (temp, humid, motion, mode),
+# so the dashboard can read all of them with a single request.
+AIO_DASHBOARD_GROUP = os.getenv("AIO_DASHBOARD_GROUP", "dashboard")
+DASHBOARD_FEEDS = ('temp', 'humid', 'motion', 'ctrl_mode')
+
+# REST endpoints are built once at startup rather than on every call.
+# Keyed by the Adafruit IO feed key (the values of FEEDS).
+AIO_BASE_URL = f"https://io.adafruit.com/api/v2/{AIO_USERNAME}"
+FEED_READ_URLS = {feed: f"{AIO_BASE_URL}/feeds/{feed}/data/last" for feed in FEEDS.values()}
+FEED_WRITE_URLS = {feed: f"{AIO_BASE_URL}/feeds/{feed}/data" for feed in FEEDS.values()}
+
 # ----------------------------------------------------------------------
 # 2. HELPER FUNCTIONS: ADAFRUIT IO API INTERACTION
 # ----------------------------------------------------------------------
 
+# One shared session for all Adafruit IO REST calls, so repeated requests
+# reuse pooled keep-alive connections instead of a new TCP+TLS handshake each.
+# Transient gateway errors are retried too (GETs only; urllib3 never retries
+# a POST by default, so control commands are not sent twice).
+AIO_SESSION = requests.Session()
+AIO_SESSION.headers.update({'X-AIO-Key': AIO_KEY})
+AIO_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.1, status_forcelist=[502, 503, 504])
+))
+
+# Headers for POST bodies, which are pre-encoded with orjson.
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# Shared worker pool for fanning out independent Adafruit IO reads.
+AIO_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+# (connect, read) timeouts for each Adafruit IO request, and an overall budget
+# for the dashboard reads so a slow upstream cannot hold a worker for the full
+# timeout-times-retries. Feeds that miss the deadline are shown as 'ERR'.
+AIO_TIMEOUT = (3.05, 5)
+AIO_DASHBOARD_DEADLINE = 6  # seconds
+
+# Short-lived cache of Adafruit IO reads. Live values change on the order of
+# seconds, so dashboard refreshes within the TTL share one upstream fetch.
+AIO_CACHE_TTL = int(os.getenv("FEED_CACHE_TTL", "3"))  # seconds
+# Feeds that must look fresher than the default, keyed by Adafruit IO feed key.
+# The security mode gates alerts, so a stale ARMED/DISARMED is worse than a
+# stale temperature.
+AIO_FEED_TTLS = {
+    FEEDS['ctrl_mode']: min(1, AIO_CACHE_TTL),
+}
+# How long a missing dashboard group (404) is remembered before retrying it.
+AIO_GROUP_MISSING_TTL = 300  # seconds
+_aio_cache = {}
+_aio_cache_lock = threading.Lock()
+
+def _aio_cache_get(key):
+    """Returns the cached value for key, or None if missing or expired."""
+    with _aio_cache_lock:
+        entry = _aio_cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+def _aio_cache_put(key, value, ttl=AIO_CACHE_TTL):
+    with _aio_cache_lock:
+        _aio_cache[key] = (time.monotonic() + ttl, value)
+
+def _feed_ttl(feed_key):
+    """Cache lifetime for a read of feed_key."""
+    return AIO_FEED_TTLS.get(feed_key, AIO_CACHE_TTL)
+
+def clear_aio_cache():
+    """Drops all cached reads, e.g. after a control command changed a feed."""
+    with _aio_cache_lock:
+        _aio_cache.clear()
+
 def fetch_aio_feed_data(feed_key):
     """
     Fetches the latest value for a specific Adafruit IO feed.
     """
-    # Use the now guaranteed-to-exist AIO_USERNAME and AIO_KEY
-    url = f"https://io.adafruit.com/api/v2/{AIO_USERNAME}/feeds/{feed_key}/data/last"
-    headers = {'X-AIO-Key': AIO_KEY}
-    
+    cached = _aio_cache_get(('feed', feed_key))
+    if cached is not None:
+        return cached
+
+    url = FEED_READ_URLS.get(feed_key) or f"{AIO_BASE_URL}/feeds/{feed_key}/data/last"
+
     try:
-        response = requests.get(url, headers=headers, timeout=5)
+        response = AIO_SESSION.get(url, timeout=AIO_TIMEOUT)
         response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-        data = response.json()
+        data = orjson.loads(response.content)
         
         # Return the value and the timestamp (ISO 8601 format)
-        return data.get('value', 'N/A'), data.get('created_at', 'N/A')
+        result = (data.get('value', 'N/A'), data.get('created_at', 'N/A'))
+        _aio_cache_put(('feed', feed_key), result, _feed_ttl(feed_key))
+        return result
         
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
         print(f"Error fetching feed {feed_key}: {e}")
         # Return a consistent error value
         return 'ERR', 'N/A'
 
+def fetch_aio_group(group_key):
+    """
+    Fetches the latest value of every feed in an Adafruit IO group in one request.
+    Returns a dict of feed key -> (value, timestamp), or None if the group is
+    missing or the request failed.
+    """
+    cached = _aio_cache_get(('group', group_key))
+    if cached is not None:
+        return cached or None  # {} marks a group known to be missing
+
+    url = f"{AIO_BASE_URL}/groups/{group_key}"
+
+    try:
+        response = AIO_SESSION.get(url, timeout=AIO_TIMEOUT)
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+    except requests.exceptions.HTTPError as e:
+        print(f"Error fetching group {group_key}: {e}")
+        if e.response is not None and e.response.status_code == 404:
+            # Not set up on this account: use per-feed reads without asking again
+            _aio_cache_put(('group', group_key), {}, AIO_GROUP_MISSING_TTL)
+        return None
+    except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+        print(f"Error fetching group {group_key}: {e}")
+        return None
+
+    feeds = {}
+    for feed in data.get('feeds', []):
+        value = feed.get('last_value')
+        feeds[feed.get('key')] = (value if value is not None else 'N/A',
+                                  feed.get('updated_at') or 'N/A')
+    # Each feed is also cached under its own key with its own TTL. Feeds with a
+    # shorter TTL are left out of the group entry, so it keeps the default
+    # lifetime and they are re-read through fetch_aio_feed_data() instead.
+    for feed_key, value in feeds.items():
+        _aio_cache_put(('feed', feed_key), value, _feed_ttl(feed_key))
+    _aio_cache_put(('group', group_key),
+                   {k: v for k, v in feeds.items() if k not in AIO_FEED_TTLS})
+    return feeds
+
+# Adafruit IO timestamps are ISO 8601 with a trailing 'Z'. Python 3.11+ parses
+# that directly; older versions need it rewritten to an explicit offset first.
+if sys.version_info >= (3, 11):
+    parse_aio_timestamp = datetime.fromisoformat
+else:
+    def parse_aio_timestamp(ts):
+        return datetime.fromisoformat(ts.replace('Z', '+00:00'))
+
+MOTION_TS_FMT = '%H:%M:%S on %b %d'
+
+# --- Optional MQTT push cache ---
+# With AIO_MQTT=1 each worker keeps one MQTT subscription to the dashboard
+# feeds, and values pushed by Adafruit IO are served straight from memory.
+# Feeds that have not pushed anything since (re)connecting fall back to the
+# REST reads above. Off by default: every worker holds its own broker
+# connection, which counts against the account's connection limit.
+AIO_MQTT_ENABLED = os.getenv("AIO_MQTT", "0") == "1"
+AIO_MQTT_HOST = "io.adafruit.com"
+AIO_MQTT_PORT = 8883
+_mqtt_latest = {}
+_mqtt_latest_lock = threading.Lock()
+_mqtt_client = None
+_mqtt_subscribed_at = None  # monotonic time of the current subscription
+
+def _on_mqtt_connect(client, userdata, flags, rc):
+    global _mqtt_subscribed_at
+    if rc != 0:
+        print(f"Adafruit IO MQTT connection failed (code {rc})")
+        return
+    for key in DASHBOARD_FEEDS:
+        client.subscribe(f"{AIO_USERNAME}/feeds/{FEEDS[key]}")
+    with _mqtt_latest_lock:
+        _mqtt_subscribed_at = time.monotonic()
+
+def _on_mqtt_disconnect(client, userdata, rc):
+    global _mqtt_subscribed_at
+    # Pushed values can no longer be trusted to be current
+    with _mqtt_latest_lock:
+        _mqtt_latest.clear()
+        _mqtt_subscribed_at = None
+
+def _on_mqtt_message(client, userdata, msg):
+    feed_key = msg.topic.rsplit('/', 1)[-1]
+    # The payload is just the value; the receive time stands in for created_at
+    received = datetime.now(timezone.utc).isoformat()
+    with _mqtt_latest_lock:
+        _mqtt_latest[feed_key] = (msg.payload.decode().strip(), received)
+
+def start_mqtt_cache():
+    """Starts this process's MQTT subscription, if enabled and not yet running."""
+    global _mqtt_client
+    if not AIO_MQTT_ENABLED or _mqtt_client is not None:
+        return
+    import paho.mqtt.client as mqtt
+
+    client = mqtt.Client(client_id=f"homeguard-web-{os.getpid()}")
+    client.username_pw_set(AIO_USERNAME, AIO_KEY)
+    client.tls_set()
+    client.on_connect = _on_mqtt_connect
+    client.on_disconnect = _on_mqtt_disconnect
+    client.on_message = _on_mqtt_message
+    try:
+        client.connect_async(AIO_MQTT_HOST, AIO_MQTT_PORT, keepalive=60)
+        client.loop_start()
+    except Exception as e:
+        print(f"Adafruit IO MQTT cache disabled: {e}")
+        return
+    atexit.register(client.loop_stop)
+    _mqtt_client = client
+
+def mqtt_latest(feed_key):
+    """Latest pushed (value, timestamp) for a feed, or None if none has arrived."""
+    with _mqtt_latest_lock:
+        return _mqtt_latest.get(feed_key)
+
+def mqtt_seed(values, fetched_at):
+    """
+    Stores REST-read {feed key: (value, timestamp)} for feeds that have not
+    pushed yet (e.g. a mode that rarely changes), provided the read started
+    after the current subscription, so a later change is guaranteed to be
+    pushed over it. Values already pushed are never overwritten.
+    """
+    with _mqtt_latest_lock:
+        if _mqtt_subscribed_at is None or fetched_at < _mqtt_subscribed_at:
+            return
+        for feed_key, value in values.items():
+            if value[0] != 'ERR':
+                _mqtt_latest.setdefault(feed_key, value)
+
+def fetch_dashboard_feeds():
+    """
+    Returns {FEEDS key: (value, timestamp)} for the dashboard feeds. Prefers
+    values pushed over MQTT (when enabled), then uses one
+    group request when possible and falls back to concurrent per-feed requests
+    for any feed the group did not return. Everything is bounded by
+    AIO_DASHBOARD_DEADLINE; feeds still pending after it are reported as 'ERR'.
+    """
+    started = time.monotonic()
+    deadline = started + AIO_DASHBOARD_DEADLINE
+
+    results = {}
+    if _mqtt_client is not None:
+        for key in DASHBOARD_FEEDS:
+            pushed = mqtt_latest(FEEDS[key])
+            if pushed is not None:
+                results[key] = pushed
+        if len(results) == len(DASHBOARD_FEEDS):
+            return results
+
+    try:
+        group = AIO_EXECUTOR.submit(fetch_aio_group, AIO_DASHBOARD_GROUP).result(
+            timeout=AIO_DASHBOARD_DEADLINE) or {}
+    except FutureTimeoutError:
+        print(f"Timed out fetching group {AIO_DASHBOARD_GROUP}")
+        group = {}
+    for key in DASHBOARD_FEEDS:
+        if key not in results and FEEDS[key] in group:
+            results[key] = group[FEEDS[key]]
+
+    futures = {
+        key: AIO_EXECUTOR.submit(fetch_aio_feed_data, FEEDS[key])
+        for key in DASHBOARD_FEEDS if key not in results
+    }
+    done, _ = wait(futures.values(), timeout=max(0, deadline - time.monotonic()))
+    for key, future in futures.items():
+        if future in done:
+            results[key] = future.result()
+        else:
+            print(f"Timed out fetching feed {FEEDS[key]}")
+            results[key] = ('ERR', 'N/A')
+
+    if _mqtt_client is not None:
+        mqtt_seed({FEEDS[key]: value for key, value in results.items()}, started)
+    return results
+
+def fetch_live_status():
+    """
+    Collects the live dashboard state (sensor values, system mode and last
+    motion time). Shared by the dashboard page and the /api/live endpoint.
+    """
+    # 1. Fetch live data from Adafruit IO feeds (one group request when possible)
+    feeds = fetch_dashboard_feeds()
+    temp_val, _ = feeds['temp']
+    humid_val, _ = feeds['humid']
+    motion_val, last_motion_time = feeds['motion']
+    mode_val, _ = feeds['ctrl_mode']
+
+    # 2. Determine last motion timestamp for display
+    # Check if last_motion_time is 'N/A' or if motion_val is not '1'
+    if motion_val == '1' and last_motion_time != 'N/A':
+        # Reformat timestamp for user display (e.g., "HH:MM:SS on MMM DD")
+        try:
+            # Parse the ISO timestamp string
+            dt_object = parse_aio_timestamp(last_motion_time)
+            last_motion_display = dt_object.strftime(MOTION_TS_FMT)
+        except ValueError:
+            last_motion_display = "Timestamp Invalid"
+    else:
+        last_motion_display = "No recent motion detected"
+
+    # 3. Compile data dictionary for template
+    live_data = {
+        'temperature': temp_val,
+        'humidity': humid_val,
+        'motion': motion_val, # '1' for detected, '0' for clear, 'ERR' for failed fetch
+    }
+
+    # 'ARMED', 'DISARMED', or 'ERR'
+    system_mode = mode_val if mode_val in ['ARMED', 'DISARMED'] else 'N/A'
+
+    return {
+        'live_data': live_data,
+        'system_mode': system_mode,
+        'last_motion_time': last_motion_display,
+    }
+
 def send_control_command(feed_key, value):
     """
     Sends a command (new value) to an Adafruit IO control feed.
     """
-    url = f"https://io.adafruit.com/api/v2/{AIO_USERNAME}/feeds/{feed_key}/data"
-    headers = {'X-AIO-Key': AIO_KEY, 'Content-Type': 'application/json'}
-    payload = {'value': value}
+    url = FEED_WRITE_URLS.get(feed_key) or f"{AIO_BASE_URL}/feeds/{feed_key}/data"
+    payload = orjson.dumps({'value': value})
 
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=5)
+        # Content-Type is set for this request only; GETs don't send a body
+        response = AIO_SESSION.post(url, data=payload, headers=JSON_HEADERS, timeout=AIO_TIMEOUT)
         response.raise_for_status()
+        clear_aio_cache()
         return True, f"Command '{value}' successfully sent to feed '{feed_key}'."
     except requests.exceptions.HTTPError as e:
         status_code = response.status_code if response else 'N/A'
@@ -130,83 +450,265 @@ def send_control_command(feed_key, value):
 # 3. HELPER FUNCTIONS: DATABASE INTERACTION (POSTGRESQL)
 # ----------------------------------------------------------------------
 
+# Return NUMERIC values as Python floats straight from the driver, so result
+# rows need no per-row float(Decimal) conversion.
+DEC2FLOAT = new_type(
+    DECIMAL.values, 'DEC2FLOAT',
+    lambda value, cur: float(value) if value is not None else None
+)
+register_type(DEC2FLOAT)
+
+# Indexes backing the per-day range queries below. environmental_data is
+# append-only and naturally ordered by time, which suits a tiny BRIN index; the
+# motion log is small, so one B-tree covers both its range and newest-first
+# reads. They are created once with `flask --app app create-indexes`, not by
+# the app itself: CONCURRENTLY builds do not block the device's sync INSERTs.
+DB_INDEXES = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_environmental_data_ts_brin "
+    "ON environmental_data USING BRIN (ts_iso) WITH (pages_per_range = 64)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_motion_events_ts_desc "
+    "ON motion_events (ts_iso DESC)",
+]
+
+@app.cli.command("create-indexes")
+def create_indexes():
+    """Creates any missing DB_INDEXES on the database at DATABASE_URL."""
+    conn = psycopg2.connect(DATABASE_URL)
+    try:
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            for ddl in DB_INDEXES:
+                print(ddl)
+                cur.execute(ddl)
+    finally:
+        conn.close()
+
+# Connections are pooled so requests skip the TCP+TLS+auth handshake to NEON.
+# The pool is created on first use so the app can start while the DB is down.
+# TCP keepalives stop idle pooled connections from being silently dropped by
+# NAT/proxies between Render and NEON, which would otherwise surface as an
+# error (and a fresh handshake) on the next request that borrows them.
+DB_KEEPALIVE = {
+    'keepalives': 1,
+    'keepalives_idle': 30,
+    'keepalives_interval': 10,
+    'keepalives_count': 3,
+}
+DB_POOL_MAX = 10
+# ThreadedConnectionPool.getconn() raises instead of waiting once all
+# DB_POOL_MAX connections are out. With many greenlets per gevent worker a
+# burst can exceed that, so requests first take a slot here (gevent-aware
+# once gunicorn has monkey-patched threading) and queue for up to
+# DB_POOL_WAIT seconds for a connection.
+DB_POOL_WAIT = 10  # seconds
+_db_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+def _get_db_pool():
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                new_pool = pool.ThreadedConnectionPool(1, DB_POOL_MAX, DATABASE_URL, **DB_KEEPALIVE)
+                atexit.register(new_pool.closeall)
+                _db_pool = new_pool
+    return _db_pool
+
 def get_db_connection():
-    """Establishes and returns a connection to the PostgreSQL database."""
+    """
+    Borrows a connection to the PostgreSQL database from the pool.
+    Hand it back with release_db_connection() when done.
+    """
+    if not _db_slots.acquire(timeout=DB_POOL_WAIT):
+        print(f"Database connection error: no pooled connection free after {DB_POOL_WAIT}s")
+        return None
     try:
-        # Use the NEON_DATABASE_URL for connection
-        conn = psycopg2.connect(DATABASE_URL)
-        return conn
+        return _get_db_pool().getconn()
     except Exception as e:
+        _db_slots.release()
         print(f"Database connection error: {e}")
         return None
 
-def fetch_sensor_data_by_date(date_str, sensor_type):
-    conn = get_db_connection()
-    if not conn:
-        return [], "Could not connect to the database."
+def release_db_connection(conn):
+    """Returns a borrowed connection to the pool, discarding it if it was closed."""
+    try:
+        _get_db_pool().putconn(conn, close=bool(conn.closed))
+    except Exception as e:
+        print(f"Database connection release error: {e}")
+    finally:
+        _db_slots.release()
 
-    column = 'temp_c' if sensor_type == 'temperature' else 'humidity_pct'
+@contextmanager
+def db_conn():
+    """
+    Borrows a pooled connection for the duration of a with-block and always
+    hands it back. Yields None if the database could not be reached.
+    """
+    conn = get_db_connection()
+    try:
+        yield conn
+    finally:
+        if conn:
+            release_db_connection(conn)
 
-    query = f"""
-        SELECT ts_iso, {column}
-        FROM environmental_data
-        WHERE ts_iso::date = %s
-        ORDER BY ts_iso ASC;
+def day_bounds(date_str):
+    """
+    Returns the half-open [start, end) datetimes covering a YYYY-MM-DD day.
+    Comparing ts_iso against real timestamps (instead of casting ts_iso::date)
+    lets PostgreSQL use the ts_iso indexes. Raises ValueError on a bad date.
     """
+    start = datetime.strptime(date_str, '%Y-%m-%d')
+    return start, start + timedelta(days=1)
+
+# Cache of per-day query results. Past days rarely change, so they are kept
+# for an hour. The hour covers late rows uploaded by the device's offline sync.
+# Today (or a future date) is still being written to and is only kept briefly.
+HISTORY_CACHE_TTL_PAST = 3600  # seconds
+HISTORY_CACHE_TTL_TODAY = 30   # seconds
+HISTORY_CACHE_MAX = 256        # entries
+_history_cache = {}
+_history_cache_lock = threading.Lock()
+
+def _history_cache_get(key):
+    """Returns the cached rows for key, or None if missing or expired."""
+    with _history_cache_lock:
+        entry = _history_cache.get(key)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+def is_past_day(day_start):
+    """True if the day starting at day_start (a day_bounds() start) has ended."""
+    return day_start.date() < datetime.now().date()
+
+def _history_cache_put(key, day_start, value):
+    ttl = HISTORY_CACHE_TTL_PAST if is_past_day(day_start) else HISTORY_CACHE_TTL_TODAY
+    now = time.monotonic()
+    with _history_cache_lock:
+        if len(_history_cache) >= HISTORY_CACHE_MAX:
+            for stale in [k for k, (expires, _) in _history_cache.items() if expires <= now]:
+                del _history_cache[stale]
+            if len(_history_cache) >= HISTORY_CACHE_MAX:
+                # Still full: drop the oldest insertion
+                del _history_cache[next(iter(_history_cache))]
+        _history_cache[key] = (now + ttl, value)
+
+# One fixed statement per sensor: the column comes from this whitelist rather
+# than string formatting, and identical SQL text lets the server reuse plans.
+# Readings are averaged into time buckets server-side, so the chart receives
+# at most one point per bucket instead of every raw sample. Buckets come back
+# already formatted as HH:MM (which sorts chronologically within one day).
+# Rows missing the reading are skipped, so no bucket is averaged to NULL.
+SENSOR_QUERIES = {
+    "temperature": """
+        SELECT to_char(date_bin(%s::interval, ts_iso, %s), 'HH24:MI') AS bucket, AVG(temp_c)
+        FROM environmental_data
+        WHERE ts_iso >= %s AND ts_iso < %s AND temp_c IS NOT NULL
+        GROUP BY bucket
+        ORDER BY bucket ASC;
+    """,
+    "humidity": """
+        SELECT to_char(date_bin(%s::interval, ts_iso, %s), 'HH24:MI') AS bucket, AVG(humidity_pct)
+        FROM environmental_data
+        WHERE ts_iso >= %s AND ts_iso < %s AND humidity_pct IS NOT NULL
+        GROUP BY bucket
+        ORDER BY bucket ASC;
+    """,
+}
+
+# Chart granularity choices (form value -> bucket width)
+GRANULARITIES = {
+    "1m": "1 minute",
+    "5m": "5 minutes",
+    "1h": "1 hour",
+}
+DEFAULT_GRANULARITY = "1m"
+
+def fetch_sensor_data_by_date(date_str, sensor_type, granularity=DEFAULT_GRANULARITY):
+    query = SENSOR_QUERIES.get(sensor_type)
+    if not query:
+        return [], "Invalid sensor type selected."
+
+    bucket = GRANULARITIES.get(granularity)
+    if not bucket:
+        return [], "Invalid granularity selected."
+
+    try:
+        start, end = day_bounds(date_str)
+    except (TypeError, ValueError):
+        return [], "Invalid date."
+
+    cache_key = ('sensor', sensor_type, granularity, start)
+    cached = _history_cache_get(cache_key)
+    if cached is not None:
+        return cached, None
 
     data = []
     error = None
-    try:
-        with conn.cursor() as cur:
-            cur.execute(query, (date_str,))
-            rows = cur.fetchall()
 
-            for ts_iso, value in rows:
-                data.append({
-                    "time": ts_iso.strftime("%H:%M:%S"),
-                    "value": float(value) if value else None
-                })
+    with db_conn() as conn:
+        if not conn:
+            return [], "Could not connect to the database."
 
-    except Exception as e:
-        error = f"Database query failed: {e}"
+        try:
+            # Named (server-side) cursor: rows stream in itersize chunks instead of
+            # the whole day being buffered client-side before we convert it.
+            with conn.cursor(name='sensor_stream') as cur:
+                cur.itersize = 2000
+                cur.execute(query, (bucket, start, start, end))
+                data = [{"time": label, "value": value} for label, value in cur]
+            _history_cache_put(cache_key, start, data)
 
-    finally:
-        conn.close()
+        except Exception as e:
+            error = f"Database query failed: {e}"
 
     return data, error
 
 def fetch_motion_logs_by_date(date_str):
-    conn = get_db_connection()
-    if not conn:
-        return [], "Could not connect to the database."
+    try:
+        start, end = day_bounds(date_str)
+    except (TypeError, ValueError):
+        return [], "Invalid date."
 
     query = """
-        SELECT ts_iso, system_mode, image_path
+        SELECT to_char(ts_iso, 'YYYY-MM-DD HH24:MI:SS'), system_mode,
+               COALESCE(NULLIF(image_path, ''), 'No image available')
         FROM motion_events
-        WHERE ts_iso::date = %s
+        WHERE ts_iso >= %s AND ts_iso < %s
         ORDER BY ts_iso ASC;
     """
 
+    cache_key = ('motion', start)
+    cached = _history_cache_get(cache_key)
+    if cached is not None:
+        return cached, None
+
     logs = []
     error = None
 
-    try:
-        with conn.cursor() as cur:
-            cur.execute(query, (date_str,))
-            rows = cur.fetchall()
-
-            for ts_iso, mode, image_path in rows:
-                logs.append({
-                    "timestamp": ts_iso.strftime("%Y-%m-%d %H:%M:%S"),
-                    "details": mode,
-                    "image_path": image_path or "No image available"
-                })
+    with db_conn() as conn:
+        if not conn:
+            return [], "Could not connect to the database."
 
-    except Exception as e:
-        error = f"Database query failed: {e}"
-
-    finally:
-        conn.close()
+        try:
+            # Stream rows from a server-side cursor rather than fetchall(), so
+            # a busy day is never held twice (raw rows + dicts) in memory.
+            with conn.cursor(name='motion_stream') as cur:
+                cur.itersize = 2000
+                cur.execute(query, (start, end))
+
+                logs = [
+                    {"timestamp": timestamp, "details": mode, "image_path": image_path}
+                    for timestamp, mode, image_path in cur
+                ]
+            # Today's log is never cached: a new intrusion must show up at once
+            if is_past_day(start):
+                _history_cache_put(cache_key, start, logs)
+
+        except Exception as e:
+            error = f"Database query failed: {e}"
 
     return logs, error
     
@@ -216,53 +718,59 @@ def fetch_motion_logs_by_date(date_str):
 
 # --- View Routes ---
 
+# Live responses may be reused by the browser for as long as the Adafruit IO
+# cache would have served the same values anyway.
+LIVE_MAX_AGE = AIO_CACHE_TTL  # seconds
+
+# Mixed into page ETags so a redeploy (new templates) never answers 304 with
+# HTML rendered by the previous release.
+STARTUP_TOKEN = f"{time.time():.0f}".encode()
+
+def live_status_etag(status, *extra):
+    """ETag for a response rendered from a fetch_live_status() snapshot."""
+    digest = hashlib.sha1(orjson.dumps(status, option=orjson.OPT_SORT_KEYS))
+    for part in extra:
+        digest.update(part)
+    return digest.hexdigest()
+
+# Last rendered dashboard, as (etag, html). The page is a pure function of the
+# live status, so while the status is unchanged every visitor gets the same
+# HTML without re-rendering the template.
+_home_page = (None, None)
+_home_page_lock = threading.Lock()
+
+def render_home(status, etag):
+    global _home_page
+    with _home_page_lock:
+        cached_etag, html = _home_page
+    if cached_etag != etag:
+        html = render_template('home.html', **status)
+        with _home_page_lock:
+            _home_page = (etag, html)
+    return html
+
 @app.route('/')
 def home():
     """Dashboard view showing live sensor data and system status."""
-    
-    # 1. Fetch live data from Adafruit IO feeds
-    temp_val, _ = fetch_aio_feed_data(FEEDS['temp'])
-    humid_val, _ = fetch_aio_feed_data(FEEDS['humid'])
-    motion_val, last_motion_time = fetch_aio_feed_data(FEEDS['motion'])
-    mode_val, _ = fetch_aio_feed_data(FEEDS['ctrl_mode'])
-    
-    # 2. Determine last motion timestamp for display
-    # Check if last_motion_time is 'N/A' or if motion_val is not '1'
-    if motion_val == '1' and last_motion_time != 'N/A':
-        # Reformat timestamp for user display (e.g., "HH:MM:SS on MMM DD")
-        try:
-            # Parse the ISO timestamp string
-            dt_object = datetime.fromisoformat(last_motion_time.replace('Z', '+00:00'))
-            last_motion_display = dt_object.strftime('%H:%M:%S on %b %d')
-        except ValueError:
-            last_motion_display = "Timestamp Invalid"
+    status = fetch_live_status()
+    etag = live_status_etag(status, STARTUP_TOKEN)
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
     else:
-        last_motion_display = "No recent motion detected"
-
-    # 3. Compile data dictionary for template
-    live_data = {
-        'temperature': temp_val,
-        'humidity': humid_val,
-        'motion': motion_val, # '1' for detected, '0' for clear, 'ERR' for failed fetch
-    }
-    
-    # 'ARMED', 'DISARMED', or 'ERR'
-    system_mode = mode_val if mode_val in ['ARMED', 'DISARMED'] else 'N/A'
-
-
-    return render_template('home.html', 
-                           live_data=live_data,
-                           system_mode=system_mode,
-                           last_motion_time=last_motion_display)
+        response = make_response(render_home(status, etag))
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = LIVE_MAX_AGE
+    return response
 
 @app.route('/dbtest')
 def dbtest():
     try:
-        conn = get_db_connection()
-        if conn:
-            return "Connected successfully!"
-        else:
-            return "Connection failed."
+        with db_conn() as conn:
+            if conn:
+                return "Connected successfully!"
+            else:
+                return "Connection failed."
     except Exception as e:
         return str(e)
 
@@ -270,66 +778,43 @@ def dbtest():
 def environmental_data():
     selected_date = None
     selected_sensor = None
+    selected_granularity = DEFAULT_GRANULARITY
     chart_data = None
     plot_error = None
 
     if request.method == 'POST':
         selected_date = request.form.get('date')
         selected_sensor = request.form.get('sensor')     # "temperature" or "humidity"
-
-        # Map UI sensor → DB column
-        sensor_to_column = {
-            "temperature": "temp_c",
-            "humidity": "humidity_pct"
-        }
-
-        # Validate sensor choice
-        if selected_sensor not in sensor_to_column:
-            plot_error = "Invalid sensor type selected."
-        else:
-            db_column = sensor_to_column[selected_sensor]
-
-            try:
-                conn = psycopg2.connect(DATABASE_URL)
-                cur = conn.cursor()
-
-                cur.execute(f"""
-                    SELECT ts_iso, {db_column}
-                    FROM environmental_data
-                    WHERE ts_iso::date = %s
-                    ORDER BY ts_iso ASC;
-                """, (selected_date,))
-
-                rows = cur.fetchall()
-                cur.close()
-                conn.close()
-
-                if not rows:
-                    plot_error = f"No data found for {selected_sensor} on {selected_date}."
-                else:
-                    labels = [row[0].strftime("%H:%M") for row in rows]
-                    values = [float(row[1]) for row in rows]
-
-                    label_name = "Temperature (°C)" if selected_sensor == "temperature" else "Humidity (%)"
-                    color = "rgba(0,122,255,1)" if selected_sensor == "temperature" else "rgba(52,199,89,1)"
-
-                    chart_data = {
-                        "labels": labels,
-                        "datasets": [{
-                            "label": label_name,
-                            "data": values,
-                            "borderColor": color,
-                            "backgroundColor": color.replace("1)", "0.2)")
-                        }]
-                    }
-
-            except Exception as e:
-                plot_error = f"Database query failed: {e}"
+        selected_granularity = request.form.get('granularity', DEFAULT_GRANULARITY)
+
+        points, plot_error = fetch_sensor_data_by_date(
+            selected_date, selected_sensor, selected_granularity
+        )
+
+        if not plot_error and not points:
+            plot_error = f"No data found for {selected_sensor} on {selected_date}."
+        elif not plot_error:
+            labels = [point["time"] for point in points]   # HH:MM
+            values = [point["value"] for point in points]
+
+            label_name = "Temperature (°C)" if selected_sensor == "temperature" else "Humidity (%)"
+            color = "rgba(0,122,255,1)" if selected_sensor == "temperature" else "rgba(52,199,89,1)"
+
+            chart_data = {
+                "labels": labels,
+                "datasets": [{
+                    "label": label_name,
+                    "data": values,
+                    "borderColor": color,
+                    "backgroundColor": color.replace("1)", "0.2)")
+                }]
+            }
 
     return render_template(
         'environmental.html',
         selected_date=selected_date,
         selected_sensor=selected_sensor,
+        selected_granularity=selected_granularity,
         chart_data=chart_data,
         plot_error=plot_error
     )
@@ -339,15 +824,12 @@ def manage_security():
     """Security management view: control system mode and view intrusion logs."""
     
     status_msg = None
-    log_error = None
-    intrusion_logs = []
     # Default to today's date for log fetching
     selected_log_date = datetime.now().strftime('%Y-%m-%d')
     
     # Handle POST requests (Arm/Disarm or Log Fetch)
     if request.method == 'POST':
         action = request.form.get('action')
-        log_date = request.form.get('date')
 
         if action in ['arm', 'disarm']:
             # Handle security mode change
@@ -357,19 +839,11 @@ def manage_security():
                 success, msg = send_control_command(feed_key, mode)
                 status_msg = msg
         
-        # If a date was submitted (for log retrieval)
-        if log_date:
-            selected_log_date = log_date
-            intrusion_logs, log_error = fetch_motion_logs_by_date(selected_log_date)
-        else:
-            # If no date was explicitly submitted, try to fetch logs for the default/current date
-            intrusion_logs, log_error = fetch_motion_logs_by_date(selected_log_date)
-
+        # A submitted date (log retrieval) replaces the default
+        selected_log_date = request.form.get('date') or selected_log_date
 
-    # Initial GET request handling or if only mode was changed: 
-    # Try to fetch today's logs automatically for initial load/view
-    if not request.method == 'POST' or (request.method == 'POST' and not request.form.get('date')):
-        intrusion_logs, log_error = fetch_motion_logs_by_date(selected_log_date)
+    # Exactly one log query per request, for the selected (or today's) date
+    intrusion_logs, log_error = fetch_motion_logs_by_date(selected_log_date)
 
     return render_template('manage_security.html', 
                            status_msg=status_msg, 
@@ -388,7 +862,60 @@ def about():
     return render_template('about.html')
 
 
-# --- API Endpoint for Device Control ---
+# --- API Endpoints ---
+
+@app.route('/api/live')
+def api_live():
+    """
+    JSON snapshot of the live dashboard values, polled by the home page.
+    Carries an ETag so unchanged values are answered with an empty 304.
+    """
+    status = fetch_live_status()
+    response = jsonify(status)
+    response.set_etag(live_status_etag(status))
+    response.cache_control.public = True
+    response.cache_control.max_age = LIVE_MAX_AGE
+    return response.make_conditional(request)
+
+
+def _one_of(*choices):
+    """Normalizer accepting only the given (case-insensitive) values."""
+    def normalize(value):
+        value = str(value).upper()
+        return value if value in choices else None
+    return normalize
+
+def _trigger(value):
+    # Momentary devices fire on any press; the device only listens for '1'
+    return '1'
+
+LCD_MAX_CHARS = 32  # 2 lines x 16 characters
+
+# Momentary devices: the press is acknowledged straight away and the publish
+# finishes in the background. Other devices do the same with ?async=1.
+BACKGROUND_DEVICES = {'buzzer', 'camera'}
+
+def _log_background_command(future):
+    """Done-callback for background control commands: reports failures."""
+    error = future.exception()
+    if error is not None:
+        print(f"Background control command failed: {error}")
+        return
+    success, message = future.result()
+    if not success:
+        print(f"Background control command failed: {message}")
+
+# Frontend device name -> (Adafruit IO feed key, value normalizer). Feed keys
+# are resolved from FEEDS here, so a missing entry fails at startup rather
+# than on a button press. A normalizer returns the value to publish, or None
+# if the value is not valid for that device.
+DEVICE_CONTROLS = {
+    'light': (FEEDS['ctrl_light'], _one_of('ON', 'OFF')),
+    'mode': (FEEDS['ctrl_mode'], _one_of('ARMED', 'DISARMED')),
+    'buzzer': (FEEDS['ctrl_buzzer'], _trigger),
+    'camera': (FEEDS['image'], _trigger),
+    'lcd_text': (FEEDS['ctrl_lcd'], lambda value: str(value)[:LCD_MAX_CHARS]),
+}
 
 @app.route('/api/control/<device>', methods=['POST'])
 def api_control(device):
@@ -397,30 +924,57 @@ def api_control(device):
     if not data or 'value' not in data:
         return jsonify({"message": "Missing 'value' in JSON body"}), 400
 
-    value = data['value']
+    control = DEVICE_CONTROLS.get(device)
+    if not control:
+        return jsonify({"message": f"Unknown device: {device}"}), 400
 
-    # Map frontend names → actual FEED keys
-    feed_key_name = {
-        'light': 'ctrl_light',
-        'buzzer': 'ctrl_buzzer',
-        'mode': 'ctrl_mode',
-        'lcd_text': 'ctrl_lcd',
-        'camera': 'image'
-    }.get(device)
+    feed_key, normalize = control
+    value = normalize(data['value'])
 
-    feed_key = FEEDS.get(feed_key_name)
+    if value is None:
+        return jsonify({"message": f"Invalid value for {device}: {data['value']}"}), 400
 
-    if not feed_key:
-        return jsonify({"message": f"Unknown device: {device}"}), 400
-    
-    # Now publish to Adafruit
-    try:
-        aio.send(feed_key, value)
-        return jsonify({"message": f"{device} updated to {value}"}), 200
-    except Exception as e:
-        return jsonify({"message": str(e)}), 500
+    if device in BACKGROUND_DEVICES or request.args.get('async') == '1':
+        future = AIO_EXECUTOR.submit(send_control_command, feed_key, value)
+        future.add_done_callback(_log_background_command)
+        return jsonify({"message": f"Command '{value}' queued for feed '{feed_key}'.",
+                        "pending": True}), 202
+
+    # Publish through the pooled Adafruit IO session
+    success, message = send_control_command(feed_key, value)
+    return jsonify({"message": message}), (200 if success else 500)
+
+
+# ----------------------------------------------------------------------
+# 5. STARTUP WARM-UP
+# ----------------------------------------------------------------------
+
+PAGE_TEMPLATES = ('home.html', 'environmental.html', 'manage_security.html',
+                  'device_control.html', 'about.html')
+
+def warm_up():
+    """
+    Opens a pooled database connection, primes the Adafruit IO keep-alive
+    connections (and live-value cache), and compiles the page templates, so
+    the first real request after a (cold) start does not pay for all three.
+    Called from gunicorn's post_worker_init hook and before the dev server.
+    """
+    with db_conn():
+        pass
+
+    start_mqtt_cache()
+    fetch_dashboard_feeds()
+
+    for name in PAGE_TEMPLATES:
+        app.jinja_env.get_template(name)
 
 
 if __name__ == '__main__':
-    # Flask will automatically use the PORT environment variable if deployed
-    app.run(debug=True, port=os.getenv("PORT", 5000))
+    warm_up()
+    # Dev server only; production runs under gunicorn (see gunicorn.conf.py).
+    # threaded=True so one page waiting on Adafruit IO/NEON doesn't block the next.
+    app.run(
+        debug=os.getenv("FLASK_DEBUG", "1") == "1",
+        threaded=True,
+        port=int(os.getenv("PORT", 5000)),
+    )
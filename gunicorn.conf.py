@@ -0,0 +1,24 @@
+# Gunicorn settings, loaded automatically when gunicorn starts from the project
+# root (e.g. `gunicorn app:app`). The app spends nearly all its time waiting on
+# Adafruit IO and NEON, so gevent workers multiplex many in-flight requests per
+# process instead of one request per sync worker.
+import os
+
+worker_class = "gevent"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_connections = int(os.getenv("WORKER_CONNECTIONS", "500"))
+timeout = 30
+
+
+def post_fork(server, worker):
+    # The gevent worker monkey-patches sockets for requests; psycopg2 is a C
+    # extension, so it needs a wait callback to yield while waiting on the DB.
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+
+
+def post_worker_init(worker):
+    # Open the DB/Adafruit IO connections and compile templates before this
+    # worker accepts its first request.
+    from app import warm_up
+    warm_up()
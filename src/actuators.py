@@ -5,16 +5,23 @@ from .pinmap import LED_STATUS, LED_WARN, LED_OK, FAN_GPIO, BUZZER
 GPIO.setwarnings(False)
 GPIO.setmode(GPIO.BCM)
 
-for pin in [LED_STATUS, LED_WARN, LED_OK]:
-    GPIO.setup(pin, GPIO.OUT, initial=GPIO.LOW)
+LEDS = (LED_STATUS, LED_WARN, LED_OK)
+
+GPIO.setup(list(LEDS), GPIO.OUT, initial=GPIO.LOW)
 
 # GPIO.setup(FAN_GPIO, GPIO.OUT, initial=GPIO.LOW)
 # GPIO.setup(BUZZER, GPIO.OUT, initial=GPIO.LOW)
 
 def set_leds(status=None, warn=None, ok=None):
-    if status is not None: GPIO.output(LED_STATUS, GPIO.HIGH if status else GPIO.LOW)
-    if warn   is not None: GPIO.output(LED_WARN,   GPIO.HIGH if warn   else GPIO.LOW)
-    if ok     is not None: GPIO.output(LED_OK,     GPIO.HIGH if ok     else GPIO.LOW)
+    # Collect the changes and hand them to RPi.GPIO in one call (it accepts
+    # parallel lists of channels and values) instead of one call per LED.
+    pins, values = [], []
+    for pin, state in zip(LEDS, (status, warn, ok)):
+        if state is not None:
+            pins.append(pin)
+            values.append(GPIO.HIGH if state else GPIO.LOW)
+    if pins:
+        GPIO.output(pins, values)
 
 # def set_fan(on: bool):
 #     GPIO.output(FAN_GPIO, GPIO.HIGH if on else GPIO.LOW)
@@ -25,7 +32,5 @@ def set_leds(status=None, warn=None, ok=None):
 #     GPIO.output(BUZZER, GPIO.LOW)
 
 def cleanup():
-    GPIO.output(LED_STATUS, GPIO.LOW)
-    GPIO.output(LED_WARN, GPIO.LOW)
-    GPIO.output(LED_OK, GPIO.LOW)
+    GPIO.output(list(LEDS), GPIO.LOW)
     GPIO.cleanup()
@@ -1,107 +1,302 @@
 import sqlite3
-from datetime import datetime
+import time
+import atexit
+from collections import deque
+from datetime import datetime, timedelta
 import psycopg2
 import psycopg2.extras
+import psycopg2.pool
 import threading
 
+# Rows read from SQLite (and committed to NEON) per sync batch, and rows per
+# multi-row INSERT statement within a batch
+SYNC_BATCH_SIZE = 1000
+SYNC_PAGE_SIZE = 500
+
+# Cleanup deletes old rows this many at a time, each chunk its own short
+# transaction, so logging is never held up behind one huge DELETE.
+CLEANUP_CHUNK_SIZE = 1000
+
+# The sync thread drops rows already synced to NEON once they are this many
+# days old, checking once per CLEANUP_INTERVAL (first one interval after start)
+RETENTION_DAYS = 30
+CLEANUP_INTERVAL = 24 * 60 * 60  # seconds
+
+# Environmental readings are buffered in memory and written to SQLite in one
+# transaction once this many are queued, when a motion event is logged, or by
+# a background thread once the buffer has waited this long. Buffered readings
+# are lost on a power cut, so the interval bounds that loss (plus up to a
+# quarter of it, the flush thread's check period).
+ENV_BUFFER_MAX = 10
+ENV_FLUSH_INTERVAL = 30  # seconds
+
+# The sync thread checks this often whether to sync on its own: once this many
+# rows are waiting, or unsynced rows have waited SYNC_MAX_AGE since the last sync
+SYNC_CHECK_INTERVAL = 30  # seconds
+SYNC_THRESHOLD = 200
+SYNC_MAX_AGE = 300  # seconds
+
+# A motion event logged with image_pending=True is held back from sync (with
+# every later motion row, so batches stay id-ordered) until its photo link is
+# attached, or for at most this long if the upload never finishes.
+MOTION_IMAGE_WAIT = 300  # seconds
+
+# (UTC day number, "YYYY-MM-DD " prefix), refreshed when the day rolls over
+_ts_day_prefix = (None, "")
+
+def utc_timestamp():
+    """
+    Current UTC time as "YYYY-MM-DD HH:MM:SS" (the format stored in SQLite and
+    synced to NEON). The date part is formatted once per day and the time
+    part with integer arithmetic, instead of a datetime + strftime per row.
+    """
+    global _ts_day_prefix
+    now = time.time()
+    day, sec = divmod(int(now), 86400)
+    cached_day, prefix = _ts_day_prefix
+    if day != cached_day:
+        prefix = time.strftime("%Y-%m-%d ", time.gmtime(now))
+        _ts_day_prefix = (day, prefix)
+    return f"{prefix}{sec // 3600:02d}:{sec // 60 % 60:02d}:{sec % 60:02d}"
+
 
 class DatabaseLogger:
     def __init__(self, local_db_path, neon_connection_string):
         self.local_db_path = local_db_path
         self.neon_conn_str = neon_connection_string
 
+        # NEON connections are kept open between syncs so each sync skips the
+        # TCP+TLS+auth handshake. The pool is created by the first sync, so the
+        # logger still starts while the Pi is offline.
+        self._pg_pool = None
+
+        # One long-lived SQLite connection, shared by the main loop and any
+        # sync thread; the lock serialises access to it.
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.local_db_path, timeout=5, check_same_thread=False)
+        # Incremental auto-vacuum lets cleanup hand freed pages back to the
+        # filesystem. It only takes effect on a new file (so it is set before
+        # the WAL switch writes the header); an existing one keeps its mode
+        # until a one-off `sqlite3 <db> "PRAGMA auto_vacuum=INCREMENTAL; VACUUM;"`.
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        # WAL + synchronous=NORMAL: commits append to the log instead of
+        # fsyncing the main database file each time (cheaper on the SD card).
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        # Read through a memory map (up to 64 MB) instead of read() syscalls
+        self._conn.execute("PRAGMA mmap_size=67108864")
+
+        self._env_buffer = deque()
+        # motion_events id -> time.monotonic() it was logged, awaiting a photo link
+        self._image_pending = {}
+        self._last_flush = time.monotonic()
+
         self._init_local_db()
 
+        # Time-based flushes run here, so log_environmental() never waits on
+        # SQLite unless the buffer is full.
+        self._stop = threading.Event()
+        self._flush_thread = threading.Thread(target=self._flush_loop, name="db-flush", daemon=True)
+        self._flush_thread.start()
+        atexit.register(self.flush)
+
+        # NEON syncs run on their own thread, woken by request_sync(), so the
+        # sensor loop never waits on the network. _sync_lock keeps a direct
+        # sync_to_cloud() call (e.g. at shutdown) from overlapping with it.
+        self._sync_lock = threading.Lock()
+        self._sync_requested = threading.Event()
+        self._last_sync = time.monotonic()
+        self._last_cleanup = time.monotonic()
+        self._sync_thread = threading.Thread(target=self._sync_loop, name="db-sync", daemon=True)
+        self._sync_thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Flushes buffered readings and releases the SQLite and NEON connections. Safe to call twice."""
+        if self._stop.is_set():
+            return
+        atexit.unregister(self.flush)
+        self._stop.set()
+        self._sync_requested.set()
+        self._flush_thread.join()
+        self._sync_thread.join()
+        self.flush()
+        if self._pg_pool is not None:
+            self._pg_pool.closeall()
+        with self._lock:
+            self._conn.close()
+
+    def request_sync(self):
+        """Asks the background thread to sync to NEON; returns immediately."""
+        self._sync_requested.set()
+
+    def _sync_loop(self):
+        while True:
+            requested = self._sync_requested.wait(SYNC_CHECK_INTERVAL)
+            if self._stop.is_set():
+                return
+            self._sync_requested.clear()
+            unsynced = self.get_unsynced_count()
+            if requested or unsynced >= SYNC_THRESHOLD or (
+                    unsynced and time.monotonic() - self._last_sync >= SYNC_MAX_AGE):
+                print(f"[DB] {unsynced} records waiting to sync...")
+                self.sync_to_cloud()
+            if time.monotonic() - self._last_cleanup >= CLEANUP_INTERVAL:
+                self.cleanup_old_synced_records(days=RETENTION_DAYS)
+                self._last_cleanup = time.monotonic()
+
+    def _flush_loop(self):
+        while not self._stop.wait(ENV_FLUSH_INTERVAL / 4):
+            if self._env_buffer and time.monotonic() - self._last_flush >= ENV_FLUSH_INTERVAL:
+                self.flush()
+
     # --------------------------------------------------
     # LOCAL SQLITE SETUP
     # --------------------------------------------------
     def _init_local_db(self):
-        conn = sqlite3.connect(self.local_db_path)
-        cur = conn.cursor()
-
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS environmental_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts_iso TEXT NOT NULL,
-            temp_c REAL,
-            humidity_pct REAL,
-            motion INTEGER DEFAULT 0,
-            synced INTEGER DEFAULT 0
-        )
-        """)
-
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS motion_events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ts_iso TEXT NOT NULL,
-            temp_c REAL,
-            humidity_pct REAL,
-            system_mode TEXT,
-            image_path TEXT,
-            synced INTEGER DEFAULT 0
-        )
-        """)
-
-        conn.commit()
-        conn.close()
+        with self._lock, self._conn:
+            cur = self._conn.cursor()
+
+            cur.execute("""
+            CREATE TABLE IF NOT EXISTS environmental_data (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts_iso TEXT NOT NULL,
+                temp_c REAL,
+                humidity_pct REAL,
+                motion INTEGER DEFAULT 0,
+                synced INTEGER DEFAULT 0
+            )
+            """)
+
+            cur.execute("""
+            CREATE TABLE IF NOT EXISTS motion_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts_iso TEXT NOT NULL,
+                temp_c REAL,
+                humidity_pct REAL,
+                system_mode TEXT,
+                image_path TEXT,
+                synced INTEGER DEFAULT 0
+            )
+            """)
+
+            # Partial indexes over just the unsynced rows: the sync and count
+            # queries become index scans that stay small however much synced
+            # history the tables hold.
+            cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_environmental_unsynced
+            ON environmental_data (id) WHERE synced = 0
+            """)
+            cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_motion_unsynced
+            ON motion_events (id) WHERE synced = 0
+            """)
+
+            # Unsynced rows are counted once here (an index-only scan of the
+            # partial indexes); after that the count is kept in memory by the
+            # insert and mark-synced paths, all under self._lock.
+            self._unsynced = sum(
+                cur.execute(f"SELECT COUNT(*) FROM {table} WHERE synced = 0").fetchone()[0]
+                for table in ("environmental_data", "motion_events"))
 
     # --------------------------------------------------
     # LOG ENVIRONMENTAL DATA (TEMP + HUMIDITY + MOTION)
     # --------------------------------------------------
     def log_environmental(self, temp_c, humidity_pct, motion=0, system_mode=None, image_path=None):
-        ts_iso = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-
-        conn = sqlite3.connect(self.local_db_path)
-        cur = conn.cursor()
-
-        cur.execute("""
-            INSERT INTO environmental_data (ts_iso, temp_c, humidity_pct, motion, synced)
-            VALUES (?, ?, ?, ?, 0)
-        """, (ts_iso, temp_c, humidity_pct, 1 if motion else 0))
-
-        conn.commit()
-        conn.close()
+        ts_iso = utc_timestamp()
+
+        self._env_buffer.append((ts_iso, temp_c, humidity_pct, 1 if motion else 0))
+        if len(self._env_buffer) >= ENV_BUFFER_MAX:
+            self.flush()
+
+    def flush(self):
+        """Writes any buffered environmental readings to SQLite."""
+        with self._lock:
+            if not self._env_buffer:
+                self._last_flush = time.monotonic()
+                return
+            # Pop only what was queued so far; readings appended meanwhile by
+            # the main loop stay in the buffer for the next flush
+            rows = [self._env_buffer.popleft() for _ in range(len(self._env_buffer))]
+            try:
+                with self._conn:
+                    self._conn.executemany("""
+                        INSERT INTO environmental_data (ts_iso, temp_c, humidity_pct, motion, synced)
+                        VALUES (?, ?, ?, ?, 0)
+                    """, rows)
+                self._unsynced += len(rows)
+            except sqlite3.Error as e:
+                print(f"[DB ERROR] flush: {e}")
+                self._env_buffer.extendleft(reversed(rows))
+            self._last_flush = time.monotonic()
 
     # --------------------------------------------------
     # LOG MOTION EVENT (SEPARATE TABLE)
     # --------------------------------------------------
-    def log_motion_event(self, temp_c=None, humidity_pct=None, system_mode=None, image_path=None):
-        ts_iso = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    def log_motion_event(self, temp_c=None, humidity_pct=None, system_mode=None, image_path=None,
+                         image_pending=False):
+        """
+        Logs a motion event at the current time and returns its row id (None on
+        error). With image_pending=True the photo link is added later by
+        attach_motion_image(), and the row is not synced until then.
+        """
+        ts_iso = utc_timestamp()
 
         try:
-            conn = sqlite3.connect(self.local_db_path)
-            cur = conn.cursor()
+            with self._lock, self._conn:
+                row_id = self._conn.execute("""
+                    INSERT INTO motion_events (ts_iso, temp_c, humidity_pct, system_mode, image_path, synced)
+                    VALUES (?, ?, ?, ?, ?, 0)
+                """, (ts_iso, temp_c, humidity_pct, system_mode, image_path)).lastrowid
+                self._unsynced += 1
+                if image_pending:
+                    self._image_pending[row_id] = time.monotonic()
 
-            cur.execute("""
-                INSERT INTO motion_events (ts_iso, temp_c, humidity_pct, system_mode, image_path, synced)
-                VALUES (?, ?, ?, ?, ?, 0)
-            """, (ts_iso, temp_c, humidity_pct, system_mode, image_path))
-
-            conn.commit()
-            cur.close()
-            conn.close()
             print("[DB] Motion event logged.")
+            # Persist buffered readings with the event, so the readings around
+            # a motion event are on disk even if the Pi loses power next
+            self.flush()
+            return row_id
 
         except Exception as e:
             print(f"[DB ERROR] log_motion_event: {e}")
+            return None
+
+    def attach_motion_image(self, row_id, image_path):
+        """Sets the photo link of a motion event logged with image_pending=True (None if the upload failed)."""
+        try:
+            with self._lock, self._conn:
+                self._image_pending.pop(row_id, None)
+                if image_path is None:
+                    return
+                synced = self._conn.execute(
+                    "SELECT synced FROM motion_events WHERE id = ?", (row_id,)).fetchone()
+                self._conn.execute(
+                    "UPDATE motion_events SET image_path = ? WHERE id = ?", (image_path, row_id))
+            if synced and synced[0]:
+                print(f"[DB] Motion event {row_id} was synced before its photo link arrived")
+
+        except Exception as e:
+            print(f"[DB ERROR] attach_motion_image: {e}")
 
     # LOG INTRUSION
     def log_intrusion(self, temp_c, humidity_pct, system_mode, image_path):
        """Logs a motion/intrusion event into motion_events table."""
-       ts_iso = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+       ts_iso = utc_timestamp()
 
        try:
-           conn = sqlite3.connect(self.local_db_path)
-           cur = conn.cursor()
-
-           cur.execute("""
-               INSERT INTO motion_events(ts_iso, temp_c, humidity_pct, system_mode, image_path)
-               VALUES(?, ?, ?, ?, ?)
-           """, (ts_iso, temp_c, humidity_pct, system_mode, image_path))
-
-           conn.commit()
-           cur.close()
-           conn.close()
+           with self._lock, self._conn:
+               self._conn.execute("""
+                   INSERT INTO motion_events(ts_iso, temp_c, humidity_pct, system_mode, image_path)
+                   VALUES(?, ?, ?, ?, ?)
+               """, (ts_iso, temp_c, humidity_pct, system_mode, image_path))
+               self._unsynced += 1
 
            print(f"[DB] Intrusion logged at {ts_iso}")
 
@@ -112,73 +307,168 @@ class DatabaseLogger:
     # COUNT UNSYNCED ROWS
     # --------------------------------------------------
     def get_unsynced_count(self):
-        conn = sqlite3.connect(self.local_db_path)
-        cur = conn.cursor()
+        """Rows not yet synced to NEON, including readings still buffered."""
+        with self._lock:
+            return self._unsynced + len(self._env_buffer)
 
-        cur.execute("SELECT COUNT(*) FROM environmental_data WHERE synced = 0")
-        env = cur.fetchone()[0]
+    # --------------------------------------------------
+    # CLEANUP OLD SYNCED ROWS
+    # --------------------------------------------------
+    def cleanup_old_synced_records(self, days=RETENTION_DAYS):
+        """
+        Deletes rows already synced to NEON that are older than `days` days,
+        then returns the freed pages so the file on the SD card shrinks.
+        Unsynced rows are always kept.
+        """
+        cutoff = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+        cutoff_iso = cutoff.strftime("%Y-%m-%d %H:%M:%S")
 
-        cur.execute("SELECT COUNT(*) FROM motion_events WHERE synced = 0")
-        mot = cur.fetchone()[0]
+        try:
+            removed = 0
+            for table in ("environmental_data", "motion_events"):
+                while True:
+                    with self._lock, self._conn:
+                        deleted = self._conn.execute(f"""
+                            DELETE FROM {table} WHERE id IN (
+                                SELECT id FROM {table} WHERE synced = 1 AND ts_iso < ? LIMIT ?
+                            )
+                        """, (cutoff_iso, CLEANUP_CHUNK_SIZE)).rowcount
+                    removed += deleted
+                    if deleted < CLEANUP_CHUNK_SIZE:
+                        break
+
+            if removed:
+                with self._lock:
+                    # incremental_vacuum frees one page per step; execute()
+                    # steps it only once, executescript() runs it to the end
+                    self._conn.executescript("PRAGMA incremental_vacuum;")
+                    # Fold the WAL back into the database and truncate it, so
+                    # the space freed above is returned from the -wal file too
+                    self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+            print(f"[DB] Cleanup removed {removed} synced records older than {days} days")
+            return removed
 
-        conn.close()
-        return env + mot
+        except Exception as e:
+            print(f"[DB ERROR] cleanup_old_synced_records: {e}")
+            return 0
 
     # --------------------------------------------------
     # SYNC TO NEON DB
     # --------------------------------------------------
     def sync_to_cloud(self):
-        conn_sqlite = sqlite3.connect(self.local_db_path)
-        cur_sqlite = conn_sqlite.cursor()
-
-        # Fetch unsynced environmental data
-        cur_sqlite.execute("""
-            SELECT id, ts_iso, temp_c, humidity_pct, motion
-            FROM environmental_data
-            WHERE synced = 0
-        """)
-        env_rows = cur_sqlite.fetchall()
-
-        # Fetch unsynced motion events
-        cur_sqlite.execute("""
-            SELECT id, ts_iso, temp_c, humidity_pct, system_mode, image_path
-            FROM motion_events
-            WHERE synced = 0
-        """)
-        motion_rows = cur_sqlite.fetchall()
-
-        if not env_rows and not motion_rows:
-            conn_sqlite.close()
-            return
+        """
+        Uploads unsynced rows to NEON in bounded, id-ordered batches, so a long
+        offline backlog never has to fit in memory (or one NEON transaction)
+        at once. Each batch is committed on both sides before the next one.
+        """
+        self.flush()
+        with self._sync_lock:
+            self._sync_batches()
+            self._last_sync = time.monotonic()
+
+    def _sync_batches(self):
+        conn_pg = None
+        failed = False
 
         try:
-            conn_pg = psycopg2.connect(self.neon_conn_str)
-            cur_pg = conn_pg.cursor()
+            while True:
+                env_rows, motion_rows = self._fetch_unsynced_batch()
+                if not env_rows and not motion_rows:
+                    return
 
-            # INSERT environmental data
-            for rid, ts, t, h, m in env_rows:
-                cur_pg.execute("""
-                    INSERT INTO environmental_data (ts_iso, temp_c, humidity_pct, motion)
-                    VALUES (%s, %s, %s, %s)
-                """, (ts, t, h, bool(m)))
+                # The NEON upload runs without holding the lock, so logging
+                # carries on while the network round trips are in flight.
+                if conn_pg is None:
+                    conn_pg = self._get_pg_pool().getconn()
+                self._upload_batch(conn_pg, env_rows, motion_rows)
+                self._mark_synced(env_rows, motion_rows)
 
-                cur_sqlite.execute("UPDATE environmental_data SET synced = 1 WHERE id = ?", (rid,))
-
-            # INSERT motion events
-            for rid, ts, t, h, mode, img in motion_rows:
-                cur_pg.execute("""
-                    INSERT INTO motion_events (ts_iso, temp_c, humidity_pct, system_mode, image_path)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (ts, t, h, mode, img))
-
-                cur_sqlite.execute("UPDATE motion_events SET synced = 1 WHERE id = ?", (rid,))
-
-            conn_pg.commit()
-            conn_sqlite.commit()
-
-            conn_pg.close()
-            conn_sqlite.close()
+                if len(env_rows) < SYNC_BATCH_SIZE and len(motion_rows) < SYNC_BATCH_SIZE:
+                    return
 
         except Exception as e:
             print(f"[DB ERROR] NEON sync failed: {e}")
-            conn_sqlite.close()
+            failed = True
+
+        finally:
+            if conn_pg is not None:
+                # A connection that failed mid-sync may be broken or inside an
+                # aborted transaction: discard it rather than pool it
+                self._pg_pool.putconn(conn_pg, close=failed or bool(conn_pg.closed))
+
+    def _get_pg_pool(self):
+        # Only called under _sync_lock
+        if self._pg_pool is None:
+            self._pg_pool = psycopg2.pool.ThreadedConnectionPool(
+                1, 2, self.neon_conn_str,
+                keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3)
+        return self._pg_pool
+
+    def _fetch_unsynced_batch(self):
+        with self._lock:
+            cur_sqlite = self._conn.cursor()
+
+            # Fetch unsynced environmental data
+            cur_sqlite.execute("""
+                SELECT id, ts_iso, temp_c, humidity_pct, motion
+                FROM environmental_data
+                WHERE synced = 0
+                ORDER BY id
+                LIMIT ?
+            """, (SYNC_BATCH_SIZE,))
+            env_rows = cur_sqlite.fetchall()
+
+            # Fetch unsynced motion events, stopping short of the first one
+            # still waiting (within MOTION_IMAGE_WAIT) for its photo link
+            now = time.monotonic()
+            waiting = [row_id for row_id, logged in self._image_pending.items()
+                       if now - logged < MOTION_IMAGE_WAIT]
+            cur_sqlite.execute("""
+                SELECT id, ts_iso, temp_c, humidity_pct, system_mode, image_path
+                FROM motion_events
+                WHERE synced = 0 AND id < ?
+                ORDER BY id
+                LIMIT ?
+            """, (min(waiting) if waiting else 2 ** 63 - 1, SYNC_BATCH_SIZE))
+            motion_rows = cur_sqlite.fetchall()
+
+        return env_rows, motion_rows
+
+    def _upload_batch(self, conn_pg, env_rows, motion_rows):
+        with conn_pg.cursor() as cur_pg:
+            # INSERT environmental data (one multi-row INSERT per page of rows
+            # instead of one round trip to NEON per row)
+            if env_rows:
+                # SQLite stores motion as 0/1; PostgreSQL casts it to boolean
+                psycopg2.extras.execute_values(cur_pg, """
+                    INSERT INTO environmental_data (ts_iso, temp_c, humidity_pct, motion)
+                    VALUES %s
+                """, (row[1:] for row in env_rows),
+                    template="(%s, %s, %s, %s::boolean)", page_size=SYNC_PAGE_SIZE)
+
+            # INSERT motion events
+            if motion_rows:
+                psycopg2.extras.execute_values(cur_pg, """
+                    INSERT INTO motion_events (ts_iso, temp_c, humidity_pct, system_mode, image_path)
+                    VALUES %s
+                """, (row[1:] for row in motion_rows), page_size=SYNC_PAGE_SIZE)
+
+        conn_pg.commit()
+
+    def _mark_synced(self, env_rows, motion_rows):
+        marked = 0
+        with self._lock:
+            with self._conn:
+                for table, rows in (("environmental_data", env_rows), ("motion_events", motion_rows)):
+                    if not rows:
+                        continue
+                    # A batch is the lowest unsynced ids in order, and only this
+                    # thread marks rows synced, so "unsynced up to the batch's
+                    # last id" is exactly the batch: one range UPDATE over the
+                    # partial index instead of binding every id.
+                    marked += self._conn.execute(
+                        f"UPDATE {table} SET synced = 1 WHERE synced = 0 AND id <= ?",
+                        (rows[-1][0],)).rowcount
+            # Only once the UPDATEs are committed
+            self._unsynced -= marked
@@ -0,0 +1,58 @@
+import time
+import threading
+
+class LcdBuffer:
+    """
+    Keeps a copy of what the character LCD shows, so show() only sends the
+    characters that changed (no clear(), which is slow on the I2C backpack).
+
+    A message shown with hold=N stays up for N seconds: show(..., idle=True)
+    updates such as the temperature line are skipped until then, instead of
+    the caller sleeping to keep the message visible.
+    """
+    def __init__(self, lcd, cols=16, rows=2):
+        self._lcd = lcd
+        self.cols = cols; self.rows = rows
+        self._lock = threading.Lock()
+        self._hold_until = 0.0
+        lcd.clear()
+        self._frame = [" " * cols] * rows
+
+    def _layout(self, text):
+        # Explicit newlines start a new row; long lines wrap like write_string
+        rows = []
+        for line in text.split("\n"):
+            rows.extend(line[i:i + self.cols] for i in range(0, max(len(line), 1), self.cols))
+        rows = rows[:self.rows] + [""] * (self.rows - len(rows))
+        return [r.ljust(self.cols) for r in rows]
+
+    def show(self, text, hold=0.0, idle=False):
+        """Displays text; returns False if skipped (idle=True during a hold)."""
+        with self._lock:
+            now = time.monotonic()
+            if idle and now < self._hold_until:
+                return False
+            if hold:
+                self._hold_until = now + hold
+            frame = self._layout(text)
+            for row, (old, new) in enumerate(zip(self._frame, frame)):
+                col = 0
+                while col < self.cols:
+                    if old[col] == new[col]:
+                        col += 1
+                        continue
+                    # Write each run of changed characters with one cursor move
+                    end = col
+                    while end < self.cols and old[end] != new[end]:
+                        end += 1
+                    self._lcd.cursor_pos = (row, col)
+                    self._lcd.write_string(new[col:end])
+                    col = end
+            self._frame = frame
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._lcd.clear()
+            self._frame = [" " * self.cols] * self.rows
+            self._hold_until = 0.0
@@ -1,19 +1,30 @@
 import os
+import io
 import pickle
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload
 
 # If modifying these scopes, delete the file token.pickle.
 SCOPES = ['https://www.googleapis.com/auth/drive.file']
 
+# Files up to this size go up in a single request; resumable uploads (one
+# session request plus chunk POSTs) are only worth it for larger files.
+RESUMABLE_MIN_BYTES = 5 * 1024 * 1024
+
+FOLDER_NAME = 'HomeGuardian'
+
 class GoogleDriveUploader:
     def __init__(self, credentials_file='credentials.json'):
         self.credentials_file = credentials_file
         self.service = None
         self.folder_id = None
+        # The folder id is saved next to token.pickle so startup skips the
+        # files().list() lookup; it is dropped if Drive reports it missing.
+        self._folder_cache = 'folder_id.txt'
         self.authenticate()
         
     def authenticate(self):
@@ -47,7 +58,27 @@ class GoogleDriveUploader:
         print("[GDRIVE] Connected to Google Drive")
         
         # Get or create HomeGuardian folder
-        self.folder_id = self._get_or_create_folder('HomeGuardian')
+        self.folder_id = self._load_folder_id()
+
+    def _load_folder_id(self):
+        """Folder ID from the local cache, looked up (and cached) on a miss"""
+        if os.path.exists(self._folder_cache):
+            with open(self._folder_cache) as f:
+                folder_id = f.read().strip()
+            if folder_id:
+                print(f"[GDRIVE] Using cached folder ID: {folder_id}")
+                return folder_id
+
+        folder_id = self._get_or_create_folder(FOLDER_NAME)
+        with open(self._folder_cache, 'w') as f:
+            f.write(folder_id)
+        return folder_id
+
+    def _refresh_folder_id(self):
+        """Forget a cached folder ID that Drive no longer knows about"""
+        if os.path.exists(self._folder_cache):
+            os.remove(self._folder_cache)
+        self.folder_id = self._load_folder_id()
     
     def _get_or_create_folder(self, folder_name):
         """Get folder ID or create if doesn't exist"""
@@ -71,19 +102,21 @@ class GoogleDriveUploader:
             print(f"[GDRIVE] Created new folder: {folder_name} (ID: {folder_id})")
             return folder_id
     
-    def upload_photo(self, local_path, photo_type='manual'):
+    def upload_photo(self, local_path, photo_type='manual', data=None):
         """
         Upload a photo to Google Drive
         
         Args:
             local_path: Path to the local photo file
             photo_type: 'manual' or 'motion' for naming
+            data: JPEG bytes already in memory; uploaded instead of reading
+                local_path, which then only supplies the name
         
         Returns:
             Google Drive file ID if successful, None otherwise
         """
         try:
-            if not os.path.exists(local_path):
+            if data is None and not os.path.exists(local_path):
                 print(f"[GDRIVE ERROR] File not found: {local_path}")
                 return None
             
@@ -93,19 +126,18 @@ class GoogleDriveUploader:
             # Create Drive filename with type prefix
             drive_filename = f"{photo_type}_{filename}"
             
-            file_metadata = {
-                'name': drive_filename,
-                'parents': [self.folder_id]
-            }
-            
-            media = MediaFileUpload(local_path, mimetype='image/jpeg', resumable=True)
+            size = len(data) if data is not None else os.path.getsize(local_path)
             
             print(f"[GDRIVE] Uploading {drive_filename}...")
-            file = self.service.files().create(
-                body=file_metadata,
-                media_body=media,
-                fields='id, name, webViewLink'
-            ).execute()
+            try:
+                file = self._create_file(local_path, drive_filename, size, data)
+            except HttpError as e:
+                # Cached folder was deleted on Drive: look it up again, retry once
+                if e.resp.status != 404:
+                    raise
+                print("[GDRIVE] Folder not found, refreshing folder ID...")
+                self._refresh_folder_id()
+                file = self._create_file(local_path, drive_filename, size, data)
             
             file_id = file.get('id')
             file_link = file.get('webViewLink', 'No link')
@@ -120,6 +152,22 @@ class GoogleDriveUploader:
             print(f"[GDRIVE ERROR] Upload failed: {e}")
             return None
     
+    def _create_file(self, local_path, drive_filename, size, data=None):
+        file_metadata = {
+            'name': drive_filename,
+            'parents': [self.folder_id]
+        }
+        resumable = size > RESUMABLE_MIN_BYTES
+        if data is not None:
+            media = MediaIoBaseUpload(io.BytesIO(data), mimetype='image/jpeg', resumable=resumable)
+        else:
+            media = MediaFileUpload(local_path, mimetype='image/jpeg', resumable=resumable)
+        return self.service.files().create(
+            body=file_metadata,
+            media_body=media,
+            fields='id, name, webViewLink'
+        ).execute()
+    
     def delete_local_file(self, local_path):
         """Delete local file after successful upload"""
         try:
@@ -1,29 +1,54 @@
-import os, csv, datetime
+import os, csv, time, datetime
+
+# Rows sit in a 64 KB write buffer rather than being flushed every few samples;
+# the file is fsynced when it rolls over and on close(), so a crash can lose at
+# most the unflushed tail of the current day.
+CSV_BUFFER_BYTES = 65536
+
+HEADER = ["ts_iso","temp_c","humidity_pct","motion","fan_on","light_on","mode","image_path"]
 
 class DailyCsvLogger:
     def __init__(self, data_dir, prefix, tz="UTC", flush_every=5):
         self.data_dir = data_dir; self.prefix = prefix; self.flush_every = flush_every
         os.makedirs(self.data_dir, exist_ok=True)
-        self._date = None; self._f = None; self._w = None; self._n = 0
+        self._date = None; self._f = None; self._w = None
+        self._buf = []  # rows handed to csv.writer in one writerows() call
+        # write() only compares time.time() with the next local midnight; the
+        # date and path are worked out once per day in _roll()
+        self._roll_at = 0.0
         self.tz = tz
 
+    def _write_buffered(self):
+        if self._buf:
+            self._w.writerows(self._buf)
+            self._buf.clear()
+
+    def _close_file(self):
+        self._write_buffered()
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+
     def _roll(self):
-        d = datetime.date.today().strftime("%Y-%m-%d")
+        today = datetime.date.today()
+        tomorrow = datetime.datetime.combine(today + datetime.timedelta(days=1), datetime.time())
+        self._roll_at = tomorrow.timestamp()
+        d = today.strftime("%Y-%m-%d")
         if d != self._date:
-            if self._f: self._f.close()
+            if self._f: self._close_file()
             path = os.path.join(self.data_dir, f"{d}_{self.prefix}.csv")
-            self._f = open(path, "a", newline="")
+            self._f = open(path, "a", newline="", buffering=CSV_BUFFER_BYTES)
             self._w = csv.writer(self._f)
             if self._f.tell() == 0:
-                self._w.writerow(["ts_iso","temp_c","humidity_pct","motion","fan_on","light_on","mode","image_path"])
-            self._date = d; self._n = 0
+                self._w.writerow(HEADER)
+            self._date = d
 
     def write(self, ts_iso, temp, hum, motion, fan_on, light_on, mode, image_path):
-        self._roll()
-        self._w.writerow([ts_iso, temp, hum, motion, fan_on, light_on, mode, image_path or ""])
-        self._n += 1
-        if self._n % self.flush_every == 0:
-            self._f.flush()
+        if time.time() >= self._roll_at:
+            self._roll()
+        self._buf.append((ts_iso, temp, hum, motion, fan_on, light_on, mode, image_path or ""))
+        if len(self._buf) >= self.flush_every:
+            self._write_buffered()
 
     def close(self):
-        if self._f: self._f.close()
+        if self._f: self._close_file(); self._f = None; self._date = None; self._roll_at = 0.0
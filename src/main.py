@@ -1,6 +1,4 @@
 import time
-import board
-import adafruit_dht
 import RPi.GPIO as GPIO
 from RPLCD.i2c import CharLCD
 from datetime import datetime
@@ -8,6 +6,11 @@ from paho.mqtt import client as mqtt
 from picamera2 import Picamera2
 from pathlib import Path
 import os
+import io
+import json
+import socket
+import queue
+import threading
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -32,6 +35,9 @@ except ImportError as e:
     print(f"[ERROR] Could not import GoogleDriveUploader: {e}")
     GoogleDriveUploader = None
 
+from src.sensors import DHTPoller, PIRWatcher
+from src.display import LcdBuffer
+
 GPIO.setwarnings(False)
 GPIO.setmode(GPIO.BCM)
 
@@ -43,7 +49,6 @@ RED = 16      # Control LED (Red)
 YELLOW = 20   # Control LED (Yellow)
 GREEN = 21    # Motion indicator LED (Green)
 
-GPIO.setup(MOTION_PIN, GPIO.IN)
 GPIO.setup(BUZZER, GPIO.OUT)
 GPIO.setup(RED, GPIO.OUT)
 GPIO.setup(YELLOW, GPIO.OUT)
@@ -55,10 +60,18 @@ GPIO.output(GREEN, False)
 GPIO.output(BUZZER, False)
 
 # Initialize sensors
-dht_sensor = adafruit_dht.DHT11(board.D4)
+# DHT11 is read on a background thread; the loop only takes the latest value
+dht_poller = DHTPoller(DHT_PIN)
+dht_poller.start()
 lcd = CharLCD('PCF8574', 0x27)
+display = LcdBuffer(lcd)
+# Stills at 1280x720 / JPEG quality 80 keep motion photos small for upload;
+# two buffers let the next frame fill while one is being encoded
+CAMERA_SIZE = (1280, 720)
+CAMERA_QUALITY = 80
 camera = Picamera2()
-camera.configure(camera.create_still_configuration())
+camera.configure(camera.create_still_configuration(main={"size": CAMERA_SIZE}, buffer_count=2))
+camera.options["quality"] = CAMERA_QUALITY
 camera.start()
 
 # Initialize Database Logger
@@ -100,94 +113,169 @@ FEED_CAMERA = f"{USERNAME}/feeds/camera-image"
 FEED_LCD_MESSAGE = f"{USERNAME}/feeds/lcd-message"
 FEED_SYSTEM_MODE = f"{USERNAME}/feeds/system-mode"
 
+CONTROL_FEEDS = (FEED_LED, FEED_BUZZER, FEED_CAMERA, FEED_LCD_MESSAGE, FEED_SYSTEM_MODE)
+
+# With AIO_ENV_GROUP set, temperature and humidity go out as one group publish
+# that Adafruit IO fans out to both feeds; otherwise one publish per feed.
+ENV_GROUP = os.getenv("AIO_ENV_GROUP")
+FEED_ENV_GROUP = f"{USERNAME}/groups/{ENV_GROUP}" if ENV_GROUP else None
+
+# Topic -> short name for log lines
+TOPIC_SHORT = {topic: topic.rsplit("/", 1)[-1] for topic in (
+    FEED_TEMP, FEED_HUMIDITY, FEED_MOTION, FEED_LED, FEED_BUZZER, FEED_CAMERA,
+    FEED_LCD_MESSAGE, FEED_SYSTEM_MODE, FEED_ENV_GROUP) if topic}
+
 # State variables
 light_on = False
 system_mode = "DISARMED"
 lcd_message = ""
-last_motion_time = 0
 motion_debounce = 2
+# Loop timestamps are time.monotonic(); run() starts its own at -inf
+# ("never"), so the first pass logs and cleans up straight away
 last_temp_read = 0
-last_db_log = 0
-last_sync_check = 0
 mqtt_connected = False
 
-def publish(feed, value):
+# Longest the main loop sleeps between passes when no motion wakes it; matches
+# the temperature read interval
+LOOP_INTERVAL = 5
+
+# Last value published per feed, and when (time.monotonic())
+_last_pub = {}
+_last_pub_time = {}
+
+def publish(feed, value, min_interval=60, epsilon=0.1, qos=0, retain=False, now=None):
+    """
+    Publishes only when the value changed (numbers: by at least epsilon) or
+    min_interval seconds have passed since the last publish to the feed.
+    `now` is the caller's time.monotonic() sample, if it already has one.
+    """
     global mqtt_connected
     if not mqtt_connected:
         return
+    if now is None:
+        now = time.monotonic()
+    if feed in _last_pub and now - _last_pub_time[feed] < min_interval:
+        last = _last_pub[feed]
+        if isinstance(value, (int, float)) and isinstance(last, (int, float)):
+            changed = abs(value - last) >= epsilon
+        else:
+            changed = value != last
+        if not changed:
+            return
     try:
-        result = client.publish(feed, str(value))
+        result = client.publish(feed, str(value), qos=qos, retain=retain)
         if result.rc == 0:
-            print(f"[MQTT PUB] {feed.split('/')[-1]}: {value}")
+            _last_pub[feed] = value
+            _last_pub_time[feed] = now
+            print(f"[MQTT PUB] {TOPIC_SHORT.get(feed, feed)}: {value}")
     except Exception as e:
         print(f"[MQTT ERROR] Publish failed: {e}")
 
+def _save_photo(filename, data):
+    try:
+        Path(filename).write_bytes(data)
+        print(f"[CAMERA] Photo saved: {filename}")
+    except Exception as e:
+        print(f"[CAMERA ERROR] Could not save {filename}: {e}")
+
 def take_photo():
+    """
+    Captures a JPEG; returns (filename, jpeg bytes), or (None, None) on error.
+    The bytes go to the uploader directly, the local copy is written on a
+    background thread.
+    """
     try:
         Path("captured_images").mkdir(exist_ok=True)
         filename = f"captured_images/image_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-        camera.capture_file(filename)
-        print(f"[CAMERA] Photo saved: {filename}")
-        return filename
+        # The JPEG is encoded straight into memory
+        buf = io.BytesIO()
+        request = camera.capture_request()
+        try:
+            request.save("main", buf, format="jpeg")
+        finally:
+            request.release()
+        data = buf.getvalue()
+        threading.Thread(target=_save_photo, args=(filename, data), daemon=True).start()
+        return filename, data
     except Exception as e:
         print(f"[CAMERA ERROR]: {e}")
-        return None
+        return None, None
+
+# Photos waiting for Google Drive, uploaded by a single worker thread so a slow
+# network never holds up the main loop. When full, new uploads are dropped.
+UPLOAD_QUEUE_SIZE = 16
+# On shutdown, wait this long for queued uploads so their links reach the DB
+UPLOAD_DRAIN_TIMEOUT = 30  # seconds
+upload_q = queue.Queue(maxsize=UPLOAD_QUEUE_SIZE)
 
-def upload_to_gdrive(filename, photo_type):
+def _upload_worker():
+    while True:
+        filename, photo_type, data, motion_id = upload_q.get()
+        result = None
+        try:
+            print(f"[GDRIVE] Uploading {photo_type} photo...")
+            result = gdrive.upload_photo(filename, photo_type, data=data)
+            if result:
+                print(f"[GDRIVE] Upload complete! File ID: {result[0]}")
+        except Exception as e:
+            print(f"[GDRIVE ERROR]: {e}")
+        # The motion event was logged at detection; add the Drive link to it
+        if motion_id is not None:
+            db_logger.attach_motion_image(motion_id, result[1] if result else None)
+        upload_q.task_done()
+
+def upload_to_gdrive(filename, photo_type, data=None, motion_id=None):
+    """
+    Queues a photo for upload; False if it could not be queued. The link of
+    the uploaded photo is attached to motion event `motion_id`, if given.
+    """
     if not gdrive or not filename:
         return False
     try:
-        print(f"[GDRIVE] Uploading {photo_type} photo...")
-        file_id = gdrive.upload_photo(filename, photo_type)
-        if file_id:
-            print(f"[GDRIVE] Upload complete! File ID: {file_id}")
-            return True
-        return False
-    except Exception as e:
-        print(f"[GDRIVE ERROR]: {e}")
+        upload_q.put_nowait((filename, photo_type, data, motion_id))
+        return True
+    except queue.Full:
+        print(f"[GDRIVE ERROR] Upload queue full, skipping {filename}")
         return False
 
+if gdrive:
+    threading.Thread(target=_upload_worker, name="gdrive-upload", daemon=True).start()
+
 def buzz_alert():
     GPIO.output(BUZZER, True)
     time.sleep(0.15)
     GPIO.output(BUZZER, False)
 
+# Set from the GPIO edge-detection thread on each (debounced) PIR rising edge
+# and by on_message; the main loop sleeps on it, so motion and commands are
+# handled as soon as they arrive
+loop_wake = threading.Event()
+
+# Control commands received on the MQTT network thread, run by the main loop
+command_q = queue.Queue()
+
 def check_motion():
-    global last_motion_time
-    current_time = time.time()
-    if GPIO.input(MOTION_PIN) == GPIO.HIGH:
-        if current_time - last_motion_time > motion_debounce:
-            last_motion_time = current_time
-            return True
-    return False
+    return pir.motion()
 
 def on_connect(client, userdata, flags, rc):
     global mqtt_connected
     if rc == 0:
         mqtt_connected = True
         print(f"\n[MQTT] Connected to Adafruit IO!")
+        # Republish everything after a (re)connect
+        _last_pub.clear()
         
-        # Subscribe to dashboard control feeds
-        client.subscribe(FEED_LED)
-        print(f"[SUBSCRIBE] {FEED_LED}")
-        
-        client.subscribe(FEED_BUZZER)
-        print(f"[SUBSCRIBE] {FEED_BUZZER}")
-        
-        client.subscribe(FEED_CAMERA)
-        print(f"[SUBSCRIBE] {FEED_CAMERA}")
-        
-        # Subscribe to Flask app control feeds
-        client.subscribe(FEED_LCD_MESSAGE)
-        print(f"[SUBSCRIBE] {FEED_LCD_MESSAGE}")
-        
-        client.subscribe(FEED_SYSTEM_MODE)
-        print(f"[SUBSCRIBE] {FEED_SYSTEM_MODE}")
+        # Subscribe to dashboard and Flask app control feeds in one SUBSCRIBE.
+        # The session is clean, so this runs on every (re)connect and commands
+        # sent while the device was offline are not replayed.
+        client.subscribe([(feed, 0) for feed in CONTROL_FEEDS])
+        for feed in CONTROL_FEEDS:
+            print(f"[SUBSCRIBE] {feed}")
         
         time.sleep(0.5)
-        publish(FEED_LED, "OFF")
+        publish(FEED_LED, "OFF", qos=1, retain=True)
         publish(FEED_MOTION, "0")
-        publish(FEED_SYSTEM_MODE, system_mode)
+        publish(FEED_SYSTEM_MODE, system_mode, qos=1, retain=True)
         print("[MQTT] Initial states published\n")
     else:
         mqtt_connected = False
@@ -198,94 +286,116 @@ def on_disconnect(client, userdata, rc):
     mqtt_connected = False
     print(f"[MQTT] Disconnected (code: {rc})")
 
+# Dashboard LED control
+def handle_led(payload):
+    global light_on, last_temp_read
+    value = payload.upper()
+    if value == "ON" or value == "1":
+        light_on = True
+        GPIO.output(RED, True)
+        GPIO.output(YELLOW, True)
+        display.show("LEDs: ON", hold=1)
+        print("[ACTION] RED + YELLOW LEDs turned ON")
+    elif value == "OFF" or value == "0":
+        light_on = False
+        GPIO.output(RED, False)
+        GPIO.output(YELLOW, False)
+        display.show("LEDs: OFF", hold=1)
+        print("[ACTION] RED + YELLOW LEDs turned OFF")
+    last_temp_read = 0
+
+# Dashboard buzzer control
+def handle_buzzer(payload):
+    global last_temp_read
+    display.show("Buzzer Active!", hold=1)
+    print("[ACTION] Buzzer activated from dashboard")
+    buzz_alert()
+    last_temp_read = 0
+
+# Dashboard camera control
+def handle_camera(payload):
+    global last_temp_read
+    value = payload.upper()
+    if value == "1" or value == "ON":
+        display.show("Taking Photo...")
+        print("[ACTION] Camera button pressed")
+        filename, photo = take_photo()
+        if filename:
+            upload_to_gdrive(filename, 'manual', photo)
+            display.show("Photo Saved!", hold=1.5)
+            print(f"[SUCCESS] Manual photo: {filename}")
+        last_temp_read = 0
+
+# Flask LCD message control
+def handle_lcd_message(payload):
+    global lcd_message, last_temp_read
+    lcd_message = payload[:32]
+    display.show(lcd_message, hold=2)
+    print(f"[ACTION] LCD message from Flask: '{lcd_message}'")
+    last_temp_read = 0
+
+# Flask system mode control
+def handle_system_mode(payload):
+    global system_mode, last_temp_read
+    value = payload.upper()
+    if value == "ARMED":
+        system_mode = "ARMED"
+        display.show("System: ARMED", hold=1.5)
+        print("[ACTION] System ARMED from Flask")
+    elif value == "DISARMED":
+        system_mode = "DISARMED"
+        display.show("System:DISARMED", hold=1.5)
+        print("[ACTION] System DISARMED from Flask")
+    last_temp_read = 0
+
+# Control feed topic -> handler, looked up once per message
+MESSAGE_HANDLERS = {
+    FEED_LED: handle_led,
+    FEED_BUZZER: handle_buzzer,
+    FEED_CAMERA: handle_camera,
+    FEED_LCD_MESSAGE: handle_lcd_message,
+    FEED_SYSTEM_MODE: handle_system_mode,
+}
+
 def on_message(client, userdata, msg):
-    global light_on, system_mode, lcd_message, last_temp_read
-    
     topic = msg.topic
     payload = msg.payload.decode().strip()
     
     print(f"\n[MQTT RCV] {topic}: '{payload}'")
 
-    try:
-        # Dashboard LED control
-        if topic == FEED_LED:
-            lcd.clear()
-            if payload.upper() == "ON" or payload == "1":
-                light_on = True
-                GPIO.output(RED, True)
-                GPIO.output(YELLOW, True)
-                lcd.write_string("LEDs: ON")
-                print("[ACTION] RED + YELLOW LEDs turned ON")
-            elif payload.upper() == "OFF" or payload == "0":
-                light_on = False
-                GPIO.output(RED, False)
-                GPIO.output(YELLOW, False)
-                lcd.write_string("LEDs: OFF")
-                print("[ACTION] RED + YELLOW LEDs turned OFF")
-            time.sleep(1)
-            last_temp_read = 0
-
-        # Dashboard buzzer control
-        elif topic == FEED_BUZZER:
-            lcd.clear()
-            lcd.write_string("Buzzer Active!")
-            print("[ACTION] Buzzer activated from dashboard")
-            buzz_alert()
-            time.sleep(0.8)
-            last_temp_read = 0
-
-        # Dashboard camera control
-        elif topic == FEED_CAMERA:
-            if payload == "1" or payload.upper() == "ON":
-                lcd.clear()
-                lcd.write_string("Taking Photo...")
-                print("[ACTION] Camera button pressed")
-                filename = take_photo()
-                if filename:
-                    lcd.clear()
-                    lcd.write_string("Uploading...")
-                    upload_to_gdrive(filename, 'manual')
-                    lcd.clear()
-                    lcd.write_string("Photo Saved!")
-                    time.sleep(1.5)
-                    print(f"[SUCCESS] Manual photo: {filename}")
-                last_temp_read = 0
-
-        # Flask LCD message control
-        elif topic == FEED_LCD_MESSAGE:
-            lcd_message = payload[:32]
-            lcd.clear()
-            if len(lcd_message) <= 16:
-                lcd.write_string(lcd_message)
-            else:
-                lcd.write_string(lcd_message[:16] + "\n" + lcd_message[16:32])
-            print(f"[ACTION] LCD message from Flask: '{lcd_message}'")
-            time.sleep(2)
-            last_temp_read = 0
-
-        # Flask system mode control
-        elif topic == FEED_SYSTEM_MODE:
-            lcd.clear()
-            if payload.upper() == "ARMED":
-                system_mode = "ARMED"
-                lcd.write_string("System: ARMED")
-                print("[ACTION] System ARMED from Flask")
-            elif payload.upper() == "DISARMED":
-                system_mode = "DISARMED"
-                lcd.write_string("System:DISARMED")
-                print("[ACTION] System DISARMED from Flask")
-            time.sleep(1.5)
-            last_temp_read = 0
-
-    except Exception as e:
-        print(f"[ERROR] on_message: {e}")
+    # Handlers touch the LCD, GPIO and loop state, so they run on the main
+    # thread: queue the command and wake the loop
+    handler = MESSAGE_HANDLERS.get(topic)
+    if handler is None:
+        return
+    command_q.put((handler, payload))
+    loop_wake.set()
 
-# Create MQTT client
-client = mqtt.Client(client_id=f"{USERNAME}", protocol=mqtt.MQTTv311)
+def run_pending_commands():
+    while True:
+        try:
+            handler, payload = command_q.get_nowait()
+        except queue.Empty:
+            return
+        try:
+            handler(payload)
+        except Exception as e:
+            print(f"[ERROR] on_message: {e}")
+
+def on_socket_open(client, userdata, sock):
+    # Small PUBLISH packets go out immediately instead of waiting on Nagle
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+# Create MQTT client. A clean session on purpose: a persistent one would replay
+# queued one-shot commands (buzzer, camera) in a burst after an outage.
+client = mqtt.Client(client_id=f"{USERNAME}", clean_session=True, protocol=mqtt.MQTTv311)
 client.username_pw_set(USERNAME, KEY)
+client.max_inflight_messages_set(20)
+client.reconnect_delay_set(min_delay=1, max_delay=30)
 client.on_connect = on_connect
 client.on_disconnect = on_disconnect
 client.on_message = on_message
+client.on_socket_open = on_socket_open
 
 # Connect to broker
 try:
@@ -313,39 +423,59 @@ except Exception as e:
     exit(1)
 
 # Startup
-lcd.clear()
-lcd.write_string("HomeGuardian\nStarting...")
+display.show("HomeGuardian\nStarting...")
 time.sleep(2)
-lcd.clear()
-lcd.write_string("System Ready!")
-time.sleep(1)
+display.show("System Ready!", hold=1)
+
+pir = PIRWatcher(MOTION_PIN, debounce_ms=int(motion_debounce * 1000), callback=loop_wake.set)
 
 print("\n" + "=" * 50)
 print("SYSTEM RUNNING")
 print("=" * 50 + "\n")
 
-cycle_count = 0
+def run():
+    """The main loop. Names it uses on every pass are bound to locals first."""
+    global last_temp_read
+    last_db_log = float("-inf")
+
+    monotonic = time.monotonic
+    sleep = time.sleep
+    gpio_output = GPIO.output
+    pub = publish
+    show = display.show
+    snapshot = dht_poller.snapshot
+    wake = loop_wake
 
-try:
     while True:
         if not mqtt_connected:
             print("[WARNING] MQTT disconnected, attempting reconnect...")
-            time.sleep(5)
+            sleep(5)
             continue
 
-        cycle_count += 1
-        current_time = time.time()
+        # Clear before looking at motion/commands: a set() from here on wakes
+        # the wait at the bottom straight away instead of being lost
+        wake.clear()
+        run_pending_commands()
+        current_time = monotonic()  # sampled once per pass
 
         # Read temperature every 5 seconds
         if current_time - last_temp_read > 5:
             try:
-                temperature = dht_sensor.temperature
-                humidity = dht_sensor.humidity
+                temperature, humidity, _ = snapshot()
 
                 if temperature is not None and humidity is not None:
+                    # DHT11 reports whole degrees/percent; the reader returns
+                    # floats, so publish and display them as integers as before
+                    temperature, humidity = round(temperature), round(humidity)
+
                     # Publish to Adafruit IO
-                    publish(FEED_TEMP, temperature)
-                    publish(FEED_HUMIDITY, humidity)
+                    if FEED_ENV_GROUP:
+                        pub(FEED_ENV_GROUP, json.dumps(
+                            {"feeds": {"temperature": temperature, "humidity": humidity}},
+                            separators=(",", ":")), now=current_time)
+                    else:
+                        pub(FEED_TEMP, temperature, now=current_time)
+                        pub(FEED_HUMIDITY, humidity, now=current_time)
                     
                     # Log to database every 30 seconds
                     if db_logger and (current_time - last_db_log > 30):
@@ -357,12 +487,9 @@ try:
                         last_db_log = current_time
                     
                     # Display on LCD
-                    lcd.clear()
-                    lcd.write_string(f"T:{temperature}C H:{humidity}%")
+                    show(f"T:{temperature}C H:{humidity}%", idle=True)
                     last_temp_read = current_time
 
-            except RuntimeError:
-                pass  # DHT sensor read error, will retry
             except Exception as e:
                 print(f"[SENSOR ERROR]: {e}")
 
@@ -372,86 +499,71 @@ try:
             print("!!! MOTION DETECTED - SYSTEM ARMED !!!")
             print("!" * 50)
 
-            image_path = None
+            # Log the event now, so its timestamp is the detection time; the
+            # photo link is added once the background upload finishes
+            motion_id = None
+            if db_logger:
+                temp_now, hum_now, _ = snapshot()
+                motion_id = db_logger.log_motion_event(
+                    temp_c=temp_now,
+                    humidity_pct=hum_now,
+                    system_mode=system_mode,
+                    image_pending=bool(gdrive)
+                )
 
             # Turn on green LED for motion
-            GPIO.output(GREEN, True)
+            gpio_output(GREEN, True)
             
             # Publish to Adafruit IO
-            publish(FEED_MOTION, "1")
+            pub(FEED_MOTION, "1")
             
             # Show on LCD
-            lcd.clear()
-            lcd.write_string("MOTION DETECTED!")
+            show("MOTION DETECTED!")
             
             # Buzzer alert
             buzz_alert()
-            time.sleep(0.5)
+            sleep(0.5)
             
             # Take photo
-            lcd.clear()
-            lcd.write_string("Taking Photo...")
-            filename = take_photo()
+            show("Taking Photo...")
+            filename, photo = take_photo()
             
+            # Upload to Google Drive in the background
+            queued = upload_to_gdrive(filename, 'motion', photo, motion_id)
+            if not queued and motion_id is not None and gdrive:
+                db_logger.attach_motion_image(motion_id, None)  # no link coming
+
             if filename:
-                # Upload to Google Drive
-                lcd.clear()
-                lcd.write_string("Uploading...")
-                result = upload_to_gdrive(filename, 'motion')
-                if isinstance(result, tuple):
-                    file_id, file_link = result
-                    image_path = file_link
-                else:
-                    file_id = None
-                    file_link = None
-                    image_path = None
-
-                # Log to database with image path
-                if db_logger:
-                     try:
-                         temp_now = dht_sensor.temperature
-                         hum_now = dht_sensor.humidity
-                     except:
-                         temp_now = None
-                         hum_now = None
-                    
-                     db_logger.log_motion_event(
-                         temp_c=temperature,
-                         humidity_pct=humidity,
-                         system_mode=system_mode,
-                         image_path=image_path
-                     )
-                
-                lcd.clear()
-                lcd.write_string("Photo Saved!")
-                time.sleep(1.5)
+                show("Photo Saved!", hold=1.5)
             
             # Turn off green LED
-            GPIO.output(GREEN, False)
-            publish(FEED_MOTION, "0")
+            gpio_output(GREEN, False)
+            pub(FEED_MOTION, "0")
             
             last_temp_read = 0
             print("Motion event complete\n")
         
-        # Periodic sync check (every 120 seconds)
-        if db_logger and (current_time - last_sync_check > 120):
-            unsynced = db_logger.get_unsynced_count()
-            if unsynced > 0:
-                print(f"[DB] {unsynced} records waiting to sync...")
-                db_logger.sync_to_cloud()
-            last_sync_check = current_time
-        
-        # Periodic motion publish when no motion
-        if cycle_count % 20 == 0:
-            publish(FEED_MOTION, "0")
-            GPIO.output(GREEN, False)
+        # Motion heartbeat: publish() skips this unless 2 minutes have
+        # passed since the last motion publish
+        pub(FEED_MOTION, "0", min_interval=120, now=current_time)
 
-        time.sleep(1)
+        wake.wait(LOOP_INTERVAL)
+
+
+try:
+    run()
 
 except KeyboardInterrupt:
     print("\n\nShutting down...")
 
 finally:
+    # Give queued photo uploads a bounded chance to finish, so their links are
+    # attached before the final sync
+    if gdrive:
+        drain = threading.Thread(target=upload_q.join, daemon=True)
+        drain.start()
+        drain.join(UPLOAD_DRAIN_TIMEOUT)
+
     # Final sync attempt
     if db_logger:
         print("[DB] Final sync attempt...")
@@ -459,11 +571,14 @@ finally:
         unsynced = db_logger.get_unsynced_count()
         if unsynced > 0:
             print(f"[DB] WARNING: {unsynced} records not synced")
+        db_logger.close()
     
-    lcd.clear()
-    lcd.write_string("Goodbye!")
+    display.show("Goodbye!")
     time.sleep(1)
     
+    dht_poller.stop()
+    pir.close()
+
     GPIO.output(BUZZER, False)
     GPIO.output(RED, False)
     GPIO.output(YELLOW, False)
@@ -473,5 +588,5 @@ finally:
     camera.stop()
     client.loop_stop()
     client.disconnect()
-    lcd.clear()
+    display.clear()
     print("Shutdown complete")
@@ -6,6 +6,8 @@ class AioClient:
         self.u = username; self.k = key
         self.host = host; self.port = port
         self.feeds = feeds
+        # Full topic per feed key, built once instead of on every publish
+        self._topics = {k: f"{username}/feeds/{v}" for k, v in feeds.items()}
         self._on_control_cb = on_control_cb
         self._cli = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2,
                                 client_id=f"homeguardian-{int(time.time())}")
@@ -15,8 +17,8 @@ class AioClient:
 
     def _on_connect(self, client, userdata, flags, rc, props=None):
         for k in ["ctrl_light","ctrl_fan","ctrl_mode"]:
-            client.subscribe(f"{self.u}/feeds/{self.feeds[k]}")
-        client.publish(f"{self.u}/feeds/{self.feeds['heartbeat']}", "online", retain=True)
+            client.subscribe(self._topics[k])
+        client.publish(self._topics['heartbeat'], "online", retain=True)
 
     def _on_message(self, client, userdata, msg):
         try:
@@ -32,4 +34,4 @@ class AioClient:
         self._cli.loop_stop()
 
     def pub(self, feed_key, val, retain=False):
-        self._cli.publish(f"{self.u}/feeds/{self.feeds[feed_key]}", str(val), retain=retain)
+        self._cli.publish(self._topics[feed_key], str(val), retain=retain)
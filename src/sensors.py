@@ -1,4 +1,5 @@
 import time
+import threading
 import board
 import adafruit_dht
 import RPi.GPIO as GPIO
@@ -22,19 +23,68 @@ class DHT11Reader:
         except Exception:
             return None, None
 
+class DHTPoller(threading.Thread):
+    """
+    Reads the DHT11 on its own thread, so the driver's bit-banged read never
+    stalls the caller. snapshot() returns the latest (temp, humidity,
+    monotonic time of the read), or (None, None, None) before the first one
+    and once the last good read is older than max_age (the sensor stopped
+    answering), so callers skip it like a failed read.
+    """
+    def __init__(self, gpio=DHT_GPIO, interval=2.0, max_age=None):
+        super().__init__(name="dht-poller", daemon=True)
+        self._reader = DHT11Reader(gpio)
+        self.interval = interval
+        self.max_age = max_age if max_age is not None else 3 * interval
+        self._lock = threading.Lock()
+        self._latest = (None, None, None)
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            t, h = self._reader.read()
+            if t is not None:
+                with self._lock:
+                    self._latest = (t, h, time.monotonic())
+            self._stop_event.wait(self.interval)
+
+    def snapshot(self):
+        with self._lock:
+            latest = self._latest
+        if latest[2] is None or time.monotonic() - latest[2] > self.max_age:
+            return None, None, None
+        return latest
+
+    def stop(self):
+        self._stop_event.set()
+
 class PIRWatcher:
-    def __init__(self, gpio=PIR_GPIO, debounce_ms=1500):
+    """
+    Rising edges are caught and debounced by RPi.GPIO's edge detection, so
+    motion() only checks a flag. An optional callback runs on the GPIO thread.
+    """
+    def __init__(self, gpio=PIR_GPIO, debounce_ms=1500, callback=None):
         self.gpio = gpio
         self.debounce_ms = debounce_ms
-        self._last = 0
+        self._callback = callback
+        self._edge = threading.Event()
         GPIO.setup(self.gpio, GPIO.IN)
+        GPIO.add_event_detect(self.gpio, GPIO.RISING, callback=self._on_edge,
+                              bouncetime=self.debounce_ms)
+
+    def _on_edge(self, channel):
+        self._edge.set()
+        if self._callback:
+            self._callback()
 
     def motion(self):
-        now = time.time() * 1000
-        if GPIO.input(self.gpio) == GPIO.HIGH and (now - self._last) > self.debounce_ms:
-            self._last = now
+        if self._edge.is_set():
+            self._edge.clear()
             return True
         return False
 
+    def close(self):
+        GPIO.remove_event_detect(self.gpio)
+
 def iso_now():
     return datetime.now(timezone.utc).isoformat()
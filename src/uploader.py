@@ -1,6 +1,12 @@
-import os, sys, json, datetime, requests
+import os, sys, json, gzip, hashlib, datetime, requests
+from requests.adapters import HTTPAdapter
 
-def upload_dropbox(token, local_path, remote_folder):
+# One keep-alive session for all uploads, so later uploads skip the TLS handshake
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+def upload_dropbox(token, local_path, remote_folder, data=None):
+    """Uploads local_path, or `data` (bytes or a file object) under its name."""
     url = "https://content.dropboxapi.com/2/files/upload"
     headers = {
         "Authorization": f"Bearer {token}",
@@ -8,8 +14,11 @@ def upload_dropbox(token, local_path, remote_folder):
                                        "mode": "overwrite", "mute": False}),
         "Content-Type": "application/octet-stream"
     }
-    with open(local_path, "rb") as f:
-        r = requests.post(url, headers=headers, data=f)
+    if data is not None:
+        r = _session.post(url, headers=headers, data=data)
+    else:
+        with open(local_path, "rb") as f:
+            r = _session.post(url, headers=headers, data=f)
     r.raise_for_status()
 
 def upload_yesterday(cfg):
@@ -23,5 +32,20 @@ def upload_yesterday(cfg):
     y = (datetime.date.today() - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
     path = os.path.join(data_dir, f"{y}_{prefix}.csv")
     if not os.path.exists(path): return f"missing {path}"
-    upload_dropbox(token, path, folder)
-    return f"uploaded {path}"
+
+    with open(path, "rb") as f:
+        raw = f.read()
+    # The hash of the last uploaded version sits in a sidecar file, so a
+    # repeat call for an unchanged CSV does not send it again
+    digest = hashlib.blake2b(raw).hexdigest()
+    sidecar = path + ".uploaded"
+    if os.path.exists(sidecar):
+        with open(sidecar) as f:
+            if f.read().strip() == digest:
+                return f"unchanged {path}"
+
+    # CSV compresses several times over; uploaded as <name>.csv.gz
+    upload_dropbox(token, path + ".gz", folder, data=gzip.compress(raw, compresslevel=6))
+    with open(sidecar, "w") as f:
+        f.write(digest)
+    return f"uploaded {path}.gz"